@@ -1,8 +1,11 @@
 from server import PromptServer  # type:ignore
 import folder_paths  # type:ignore
+from aiohttp import web
 import os
 import threading
 import time
+import itertools
+import collections
 import datetime
 
 
@@ -29,89 +32,287 @@ class HotReload_Terminal:
 CHECKER_THREAD_NAME = "HotReload.LogFileChecker"
 
 
-# func checker
-def LogFileChecker(selfStamp):
+# 首次打开（或日志轮转/截断后）只回放末尾的这部分内容
+INITIAL_TAIL_BYTES = 64 * 1024
 
-    CheckedLine = 0
-    CheckedDateSec = 0.0
 
-    while True:
+# 处理时间格式，移除毫秒部分
+def FormatLogLine(line):
+    if line.startswith("[20"):
+        time_end = line.find("]")
+        if time_end > 0:
+            time_str = line[1:time_end]
+            if "." in time_str:
+                time_str = time_str.split(".")[0]
+            line = "[" + time_str + "]" + line[time_end+1:]
+    return line
+
+
+# 基于字节偏移的日志尾随读取，每次只读取新追加的内容
+class LogFileTail:
+
+    def __init__(self, path):
+        self.Path = path
+        self.Offset = 0
+        self.Inode = None
+        self.Partial = b""
+        self.SkipHead = False
+
+    # return (new lines, whether the file was (re)opened from scratch)
+    def ReadNew(self):
         try:
+            stat = os.stat(self.Path)
+        except OSError:
+            return [], False
+
+        reset = False
+        if self.Inode != stat.st_ino or stat.st_size < self.Offset:
+            # first open, rotation (new inode) or truncation
+            reset = True
+            self.Inode = stat.st_ino
+            self.Offset = max(0, stat.st_size - INITIAL_TAIL_BYTES)
+            self.Partial = b""
+            self.SkipHead = self.Offset > 0
+
+        if stat.st_size == self.Offset:
+            return [], reset
+
+        with open(self.Path, "rb") as file:
+            file.seek(self.Offset)
+            data = file.read(stat.st_size - self.Offset)
+        self.Offset += len(data)
+
+        data = self.Partial + data
+        if self.SkipHead:
+            # drop the partial line we seeked into
+            newline = data.find(b"\n")
+            if newline < 0:
+                self.Partial = b""
+                return [], reset
+            data = data[newline+1:]
+            self.SkipHead = False
+
+        lines = data.split(b"\n")
+        self.Partial = lines.pop()
+        return [FormatLogLine(line.decode("utf-8", errors="replace").rstrip("\r")) for line in lines], reset
+
+
+# ring buffer + batching
+LOG_BUFFER_LINES = 4096
+BATCH_WINDOW = 0.05
+BATCH_MAX_LINES = 512
+TERMINAL_LOG_EVENT = "/hotreload.terminal.log"
+
+
+# 带序号的日志环形缓冲区，断线重连的客户端可以按序号补齐缺失的行
+# 序号在 ComfyUI 重启（或本管线重建）后从 1 开始，Epoch 用于让客户端识别并重置已读序号
+class TerminalLogBuffer:
+
+    def __init__(self, maxLines=LOG_BUFFER_LINES):
+        self.Epoch = f"{os.getpid()}-{time.time_ns()}"
+        self.Lines = collections.deque(maxlen=maxLines)
+        self.Seq = 0
+        self.ClearSeq = 0
+        self.Condition = threading.Condition()
+
+    def Append(self, lines, clear=False):
+        with self.Condition:
+            if clear:
+                self.Lines.clear()
+                self.ClearSeq = self.Seq + 1
+            for line in lines:
+                self.Seq += 1
+                self.Lines.append((self.Seq, line))
+            self.Condition.notify_all()
+
+    # lines after `seq` (at most `limit`); clear=True when the log was reset after `seq`
+    def Since(self, seq, limit=None):
+        with self.Condition:
+            clear = self.ClearSeq > seq
+            start = max(0, seq + 1 - self.Lines[0][0]) if self.Lines else 0
+            stop = start + limit if limit else None
+            entries = list(itertools.islice(self.Lines, start, stop))
+            return {
+                "epoch": self.Epoch,
+                "text": "\n".join(line for _, line in entries),
+                "first_seq": entries[0][0] if entries else self.Seq + 1,
+                "seq": entries[-1][0] if entries else self.Seq,
+                "clear": clear,
+            }
+
+
+# 日志推送管线：ComfyUI 日志拦截器（或日志文件变更通知）写入缓冲区，批量推送给前端
+class TerminalLogPipeline:
+
+    def __init__(self):
+        self.Buffer = TerminalLogBuffer()
+        self.StopEvent = threading.Event()
+        self.SentSeq = 0
+        self.SentClearSeq = 0
+        self.Partial = ""
+        self.PartialLock = threading.Lock()
+        self.Interceptors = []
+        self.Writers = {}
+        self.Observer = None
+        self.Tail = None
+        self.Thread = None
+
+    def Start(self):
+        if not self.HookLogger():
+            self.WatchLogFile()
+        self.Thread = threading.Thread(target=self.RunBatcher, name=CHECKER_THREAD_NAME, daemon=True)
+        self.Thread.start()
+
+    def IsRunning(self):
+        return self.Thread is not None and self.Thread.is_alive() and not self.StopEvent.is_set()
+
+    def Stop(self):
+        self.StopEvent.set()
+        for interceptor in self.Interceptors:
+            # only unwrap if nobody wrapped write() after us
+            if interceptor.__dict__.get("write") is self.Writers.get(id(interceptor)):
+                del interceptor.write
+        self.Interceptors = []
+        self.Writers = {}
+        if self.Observer is not None:
+            self.Observer.stop()
+            self.Observer = None
+        with self.Buffer.Condition:
+            self.Buffer.Condition.notify_all()
+        if self.Thread is not None and self.Thread is not threading.current_thread():
+            self.Thread.join(timeout=1)
+
+    # ComfyUI app.logger: every write to stdout/stderr is copied to us
+    def HookLogger(self):
+        try:
+            from app import logger as comfyLogger  # type:ignore
+        except ImportError:
+            return False
+        interceptors = [x for x in (getattr(comfyLogger, "stdout_interceptor", None), getattr(comfyLogger, "stderr_interceptor", None)) if x is not None]
+        if not interceptors or not hasattr(comfyLogger, "get_logs"):
+            return False
+        # replay what was logged before we were loaded
+        self.OnFlush(list(comfyLogger.get_logs() or []))
+        for interceptor in interceptors:
+            self.WrapWrite(interceptor)
+        self.Interceptors = interceptors
+        return True
+
+    # LogInterceptor.flush hands the same _logs_since_flush list to every on_flush callback and resets it
+    # inside the callback loop, so a callback registered after ComfyUI's own TerminalService only gets
+    # empty lists; take our own copy in write() instead
+    def WrapWrite(self, interceptor):
+        original = interceptor.write
+
+        def write(data):
+            result = original(data)
+            if isinstance(data, str) and data:
+                self.OnFlush([{"t": datetime.datetime.now().isoformat(), "m": data}])
+            return result
+
+        interceptor.write = write
+        self.Writers[id(interceptor)] = write
+
+    def OnFlush(self, entries):
+        lines = []
+        with self.PartialLock:
+            for entry in entries:
+                self.Partial += entry.get("m") or ""
+                if "\n" not in self.Partial:
+                    continue
+                parts = self.Partial.split("\n")
+                self.Partial = parts.pop()
+                stamp = str(entry.get("t") or "")[:19].replace("T", " ")
+                for part in parts:
+                    # progress bars rewrite the line with \r, keep the final state only
+                    part = part.rsplit("\r", 1)[-1]
+                    lines.append(f"[{stamp}] {part}" if stamp else part)
+        if lines:
+            self.Buffer.Append(lines)
+
+    # fallback: tail the log file written by ComfyUI-Manager, driven by file change notifications
+    def WatchLogFile(self):
+        from watchdog.observers import Observer
+        from watchdog.events import FileSystemEventHandler
+
+        pipeline = self
+
+        class LogFileHandler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                if not event.is_directory:
+                    pipeline.OnLogFileChanged()
+
+        self.Observer = Observer()
+        self.Observer.schedule(LogFileHandler(), folder_paths.get_user_directory(), recursive=False)
+        self.Observer.daemon = True
+        self.Observer.start()
+        self.OnLogFileChanged()
+
+    def OnLogFileChanged(self):
+        port = PromptServer.instance.port if hasattr(PromptServer.instance, "port") else 8000
+        logFilePath = os.path.join(folder_paths.get_user_directory(), f"comfyui_{port}.log")
+        if self.Tail is None or self.Tail.Path != logFilePath:
+            self.Tail = LogFileTail(logFilePath)
+        lines, requareClear = self.Tail.ReadNew()
+        if lines or requareClear:
+            self.Buffer.Append(lines, clear=requareClear)
+
+    # wait (without timeout) for new lines, then coalesce them for up to BATCH_WINDOW
+    def RunBatcher(self):
+        buffer = self.Buffer
+        while True:
+            with buffer.Condition:
+                while buffer.Seq == self.SentSeq and buffer.ClearSeq == self.SentClearSeq and not self.StopEvent.is_set():
+                    buffer.Condition.wait()
+                if self.StopEvent.is_set():
+                    return
+                deadline = time.monotonic() + BATCH_WINDOW
+                while buffer.Seq - self.SentSeq < BATCH_MAX_LINES:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    buffer.Condition.wait(remaining)
+                batch = buffer.Since(self.SentSeq, BATCH_MAX_LINES)
+                self.SentSeq = batch["seq"]
+                self.SentClearSeq = buffer.ClearSeq
+            try:
+                PromptServer.instance.send_sync(TERMINAL_LOG_EVENT, batch)
+            except Exception as e:
+                print(f"[LG_HotReload] Terminal log push failed: {e}")
+
+
+@PromptServer.instance.routes.get("/hotreload/terminal/log")
+async def GetTerminalLog(request):
+    try:
+        since = int(request.query.get("since", 0))
+    except ValueError:
+        since = 0
+    if TerminalPipeline is None:
+        return web.json_response({"epoch": None, "text": "", "first_seq": 1, "seq": 0, "clear": False})
+    return web.json_response(TerminalPipeline.Buffer.Since(since))
+
+
+# process-wide singleton; kept on PromptServer.instance so a re-import of this module
+# (e.g. when this pack itself is hot reloaded) replaces the running pipeline instead of adding one
+SERVICE_ATTRIBUTE = "hotreload_terminal_pipeline"
+TerminalPipeline = None
+
+
+def StartTerminalService():
+    global TerminalPipeline
+    current = getattr(PromptServer.instance, SERVICE_ATTRIBUTE, None)
+    if current is not None and current is TerminalPipeline and current.IsRunning():
+        return current
+    if current is not None:
+        current.Stop()
+    TerminalPipeline = TerminalLogPipeline()
+    TerminalPipeline.Start()
+    setattr(PromptServer.instance, SERVICE_ATTRIBUTE, TerminalPipeline)
+    return TerminalPipeline
+
 
-            # check for stop
-            for thread in threading.enumerate():
-                if thread.name == CHECKER_THREAD_NAME:
-                    stamp = thread.__dict__.get("stamp")
-                    if stamp > selfStamp:
-                        return
-
-            # check file
-            port = PromptServer.instance.port if hasattr(PromptServer.instance, "port") else 8000
-
-            logFilePath = os.path.join(folder_paths.get_user_directory(), f"comfyui_{port}.log")
-            if os.path.isfile(logFilePath):
-                fileDateSec = os.path.getmtime(logFilePath)
-                if fileDateSec > CheckedDateSec + 0.1:
-                    requareClear = CheckedLine == 0
-                    CheckedDateSec = fileDateSec
-                    resultText = ""
-                    try:
-                        # Try UTF-8 encoding first
-                        with open(logFilePath, "r", encoding="utf-8") as file:
-                            currentLine = 0
-                            for line in file:
-                                if currentLine > CheckedLine:
-                                    CheckedLine = currentLine
-                                    # 处理时间格式，移除毫秒部分
-                                    if line.startswith("[20"):
-                                        try:
-                                            time_end = line.index("]")
-                                            if time_end > 0:
-                                                time_str = line[1:time_end]
-                                                if "." in time_str:
-                                                    time_str = time_str.split(".")[0]
-                                                line = "[" + time_str + "]" + line[time_end+1:]
-                                        except:
-                                            pass
-                                    resultText += line + "\n"
-                                currentLine += 1
-                    except UnicodeDecodeError:
-                        # If UTF-8 fails, try with error handling
-                        with open(logFilePath, "r", encoding="utf-8", errors="replace") as file:
-                            currentLine = 0
-                            for line in file:
-                                if currentLine > CheckedLine:
-                                    CheckedLine = currentLine
-                                    # 处理时间格式，移除毫秒部分
-                                    if line.startswith("[20"):
-                                        try:
-                                            time_end = line.index("]")
-                                            if time_end > 0:
-                                                time_str = line[1:time_end]
-                                                if "." in time_str:
-                                                    time_str = time_str.split(".")[0]
-                                                line = "[" + time_str + "]" + line[time_end+1:]
-                                        except:
-                                            pass
-                                    resultText += line + "\n"
-                                currentLine += 1
-                    PromptServer.instance.send_sync(
-                        "/hotreload.terminal.log", {"text": resultText, "clear": requareClear}
-                    )
-        finally:
-            # loop
-            time.sleep(1)
-
-
-# get current largest stamp
-currentMaxStamp = 0
-for thread in threading.enumerate():
-    if thread.name == CHECKER_THREAD_NAME:
-        stamp = thread.__dict__.get("stamp")
-        currentMaxStamp = max(currentMaxStamp, stamp)
-
-# start new checker
-timestamp = max(int(datetime.datetime.now().timestamp()), currentMaxStamp + 1)
-newThread = threading.Thread(target=LogFileChecker, name=CHECKER_THREAD_NAME, args=(timestamp,))
-newThread.__dict__["stamp"] = timestamp
-newThread.start()
+def StopTerminalService():
+    current = getattr(PromptServer.instance, SERVICE_ATTRIBUTE, None)
+    if current is not None:
+        current.Stop()
+        setattr(PromptServer.instance, SERVICE_ATTRIBUTE, None)
@@ -9,9 +9,33 @@ import threading
 from collections import defaultdict
 import traceback
 import asyncio
-
-from watchdog.observers.polling import PollingObserver as Observer
-from watchdog.events import FileSystemEventHandler
+import ast
+import inspect
+import re
+import heapq
+import math
+import bisect
+import builtins
+import gc
+import types
+import weakref
+import contextlib
+import importlib.util
+import queue
+import subprocess
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from watchdog.observers import Observer as NativeObserver
+from watchdog.observers.api import BaseObserver, DEFAULT_OBSERVER_TIMEOUT
+from watchdog.observers.polling import PollingObserverVFS
+from watchdog.events import FileSystemEventHandler, FileCreatedEvent, FileMovedEvent, DirCreatedEvent, DirDeletedEvent, DirMovedEvent
+try:
+    from watchdog.observers.inotify import InotifyEmitter
+    from watchdog.observers.inotify_buffer import InotifyBuffer
+except Exception:
+    # 非 Linux 平台（或 libc 不支持 inotify）
+    InotifyEmitter = None
 from aiohttp import web
 import folder_paths
 from nodes import load_custom_node
@@ -21,9 +45,21 @@ import json
 import nodes
 
 from .Nodes.Terminal import *
-RELOADED_CLASS_TYPES: dict = {}
+# 节点类型 -> 最近一次重载的代数；各缓存记录自己已处理到的代数，按类型精确失效
+RELOADED_CLASS_TYPES: dict[str, int] = {}
+RELOAD_GENERATION: int = 0
+# 写入在服务器事件循环线程，读取在执行线程（set_prompt）
+RELOAD_GENERATION_LOCK: threading.Lock = threading.Lock()
+def mark_classes_reloaded(class_types):
+
+    global RELOAD_GENERATION
+    with RELOAD_GENERATION_LOCK:
+        RELOAD_GENERATION += 1
+        for class_type in class_types:
+            RELOADED_CLASS_TYPES[class_type] = RELOAD_GENERATION
 CUSTOM_NODE_ROOT: list[str] = folder_paths.folder_names_and_paths["custom_nodes"][0]
 CONFIG_PATH = os.path.join(os.path.dirname(__file__), "config.json")
+JOURNAL_PATH = os.path.join(os.path.dirname(__file__), "reload_journal.jsonl")
 def load_exclude_modules() -> set[str]:
     
     try:
@@ -53,20 +89,130 @@ async def update_exclude_modules(request):
         global EXCLUDE_MODULES
         EXCLUDE_MODULES = modules
         save_exclude_modules(modules)
+        # 根据新的排除列表增删监听
+        if HOT_RELOADER_SERVICE is not None:
+            await asyncio.wrap_future(HOT_RELOADER_SERVICE.sync_watches())
         return web.json_response({"status": "success"})
     except Exception as e:
         return web.json_response({"status": "error", "message": str(e)}, status=500)
     
+@PromptServer.instance.routes.get("/hotreload/fingerprint_stats")
+async def get_fingerprint_stats(request):
+    # hits 即因内容未变化而省去的重载事件数
+    return web.json_response(FILE_FINGERPRINTS.stats())
+@PromptServer.instance.routes.get("/hotreload/queue_stats")
+async def get_queue_stats(request):
+    if HOT_RELOADER_SERVICE is None:
+        return web.json_response({})
+    return web.json_response(HOT_RELOADER_SERVICE.queue_stats())
+@PromptServer.instance.routes.get("/hotreload/stats")
+async def get_reload_stats(request):
+    # ?format=prometheus 输出 Prometheus 文本格式，默认 JSON
+    stats = collect_reload_stats()
+    if request.query.get("format") == "prometheus":
+        return web.Response(
+            text=RELOAD_STATS.prometheus(stats),
+            content_type="text/plain",
+            headers={"X-Content-Type-Options": "nosniff"}
+        )
+    return web.json_response(stats)
+@PromptServer.instance.routes.get("/hotreload/profiles")
+async def get_import_profiles(request):
+    return web.json_response({"enabled": IMPORT_PROFILER.enabled, "profiles": IMPORT_PROFILER.profiles()})
+@PromptServer.instance.routes.post("/hotreload/profiles")
+async def update_import_profiles(request):
+    try:
+        data = await request.json()
+        if "enabled" in data:
+            IMPORT_PROFILER.enabled = bool(data["enabled"])
+        if data.get("clear"):
+            IMPORT_PROFILER.clear()
+        return web.json_response({"status": "success", "enabled": IMPORT_PROFILER.enabled})
+    except Exception as e:
+        return web.json_response({"status": "error", "message": str(e)}, status=500)
+@PromptServer.instance.routes.post("/hotreload/object_info")
+async def get_object_info_batch(request):
+    # 一次请求返回多个节点类型的 object_info，重载后前端只需要一次往返
+    try:
+        data = await request.json()
+        class_types = [x for x in data.get("classes", []) if isinstance(x, str)]
+        definitions = await asyncio.get_running_loop().run_in_executor(None, collect_node_definitions, class_types)
+        return web.json_response(definitions)
+    except Exception as e:
+        return web.json_response({"status": "error", "message": str(e)}, status=500)
+@PromptServer.instance.routes.get("/hotreload/leaks")
+async def get_module_leaks(request):
+    # 被替换后仍未回收的旧版本模块/类，以及它们的引用链
+    try:
+        depth = max(1, min(int(request.query.get("depth", 3)), 6))
+    except ValueError:
+        depth = 3
+    report = await asyncio.get_running_loop().run_in_executor(None, MODULE_GENERATIONS.leaks, depth)
+    return web.json_response(report)
+@PromptServer.instance.routes.get("/hotreload/history")
+async def get_reload_history(request):
+    # 持久化的重载记录，最新的在前；?module= 过滤节点包
+    try:
+        limit = max(1, min(int(request.query.get("limit", 100)), 1000))
+    except ValueError:
+        limit = 100
+    return web.json_response({"history": RELOAD_JOURNAL.history(request.query.get("module"), limit)})
 @PromptServer.instance.routes.get("/hotreload/get_all_modules")
 async def get_all_modules(request):
+    # 节点包清单由文件监听维护，请求直接读内存；?refresh=1 强制重新扫描
     try:
-        modules = []
-        for item in os.listdir(CUSTOM_NODE_ROOT[0]):
-            item_path = os.path.join(CUSTOM_NODE_ROOT[0], item)
-            if os.path.isdir(item_path) and not item.startswith('.'):
-                if os.path.exists(os.path.join(item_path, '__init__.py')):
-                    modules.append(item)
-        return web.json_response({"modules": modules})
+        if request.query.get("refresh") or not PACK_INVENTORY.populated:
+            await asyncio.get_running_loop().run_in_executor(None, PACK_INVENTORY.refresh)
+        etag, modules, packs = PACK_INVENTORY.snapshot()
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if request.headers.get("If-None-Match") == etag:
+            return web.Response(status=304, headers=headers)
+        return web.json_response({"modules": modules, "packs": packs}, headers=headers)
+    except Exception as e:
+        return web.json_response({"status": "error", "message": str(e)}, status=500)
+@PromptServer.instance.routes.post("/hotreload/reload")
+async def reload_modules_on_demand(request):
+    # 按需批量重载：{"modules": [...]} 或 {"since": 时间戳}（该时间之后有 .py 文件变化的节点包），整批只切换一次
+    try:
+        try:
+            data = await request.json()
+        except ValueError:
+            data = None
+        if not isinstance(data, dict):
+            return web.json_response({"status": "error", "message": "expected a JSON object"}, status=400)
+        if HOT_RELOADER_SERVICE is None:
+            return web.json_response({"status": "error", "message": "hot reload service is not running"}, status=503)
+        loop = asyncio.get_running_loop()
+        if data.get("since") is not None:
+            since = data["since"]
+            if isinstance(since, bool) or not isinstance(since, (int, float, str)):
+                since = None
+            else:
+                try:
+                    since = float(since)
+                except ValueError:
+                    since = None
+            if since is None or not math.isfinite(since):
+                return web.json_response({"status": "error", "message": "\"since\" must be a timestamp"}, status=400)
+            jobs = await loop.run_in_executor(None, collect_changed_since, since)
+        else:
+            names = data.get("modules")
+            if not isinstance(names, list) or not names or not all(isinstance(x, str) for x in names):
+                return web.json_response({"status": "error", "message": "expected \"modules\" (list) or \"since\""}, status=400)
+            missing = [
+                x for x in names
+                if x in (".", "..") or os.path.basename(x) != x or not os.path.exists(os.path.join(CUSTOM_NODE_ROOT[0], x))
+            ]
+            if missing:
+                return web.json_response({"status": "error", "message": "unknown modules", "missing": missing}, status=404)
+            jobs = dict.fromkeys(names)
+        started = time.perf_counter()
+        results = await loop.run_in_executor(None, HOT_RELOADER_SERVICE.reload_modules, jobs) if jobs else {}
+        return web.json_response({
+            "status": "success" if all(x == "ok" for x in results.values()) else "error",
+            "results": results,
+            "duration": time.perf_counter() - started
+        })
     except Exception as e:
         return web.json_response({"status": "error", "message": str(e)}, status=500)
 @PromptServer.instance.routes.get("/extensions/{module_name}/{path:.*}")
@@ -75,130 +221,1550 @@ async def dynamic_extensions_handler(request):
     module_name = request.match_info['module_name']
     file_path = request.match_info['path']
 
-    # 优先从 EXTENSION_WEB_DIRS 中查找（自定义节点，支持热更新）
-    if module_name in nodes.EXTENSION_WEB_DIRS:
-        web_dir = nodes.EXTENSION_WEB_DIRS[module_name]
-        full_path = os.path.join(web_dir, file_path)
-
-        if os.path.isfile(full_path):
-            return web.FileResponse(full_path)
+    # 解析结果按 (模块, 路径) 缓存；优先 EXTENSION_WEB_DIRS（自定义节点，支持热更新），
+    # 其次 ComfyUI 前端包的 extensions 目录（系统扩展如 core）
+    full_path = WEB_ASSETS.resolve(module_name, file_path)
+    if full_path is None:
+        # 如果都找不到，返回404
+        raise web.HTTPNotFound()
 
-    # 如果不在 EXTENSION_WEB_DIRS 中，尝试从 ComfyUI 前端包的 extensions 目录查找（系统扩展如 core）
-    # PromptServer.instance.web_root 指向前端包的静态文件目录
-    # 例如：E:\python3.11\Lib\site-packages\comfyui_frontend_package\static
-    if hasattr(PromptServer.instance, 'web_root') and PromptServer.instance.web_root:
-        web_root = PromptServer.instance.web_root
-        full_path = os.path.join(web_root, "extensions", module_name, file_path)
-
-        if os.path.isfile(full_path):
-            return web.FileResponse(full_path)
+    # mtime/size 作为 ETag：不在事件循环上读取、哈希文件，也不把前端包的文件写进文件指纹缓存与重载日志
+    headers = {"Cache-Control": "no-cache"}
+    try:
+        st = os.stat(full_path)
+    except OSError:
+        WEB_ASSETS.forget(normalize_path(full_path))
+        raise web.HTTPNotFound()
+    headers["ETag"] = f'"{st.st_mtime_ns:x}-{st.st_size:x}"'
+    if request.headers.get("If-None-Match") == headers["ETag"]:
+        return web.Response(status=304, headers=headers)
+    return web.FileResponse(full_path, headers=headers)
+
+def split_route_path(path: str) -> list[str]:
+    """按 / 切分路由路径，忽略 {name:regex} 中正则里的 /"""
+    segments, current, depth = [], [], 0
+    for ch in path:
+        if ch == '{':
+            depth += 1
+        elif ch == '}':
+            depth -= 1
+        if ch == '/' and depth == 0:
+            segments.append(''.join(current))
+            current = []
+        else:
+            current.append(ch)
+    segments.append(''.join(current))
+    return segments
+def compile_route_segment(segment: str) -> re.Pattern:
+    """把含 {name} / {name:regex} 的路径段编译为正则（默认参数规则与 aiohttp 一致）"""
+    pattern, pos = [], 0
+    for match in re.finditer(r"\{(\w+)(?::((?:[^{}]|\{[^{}]*\})*))?\}", segment):
+        pattern.append(re.escape(segment[pos:match.start()]))
+        pattern.append(f"(?P<{match.group(1)}>{match.group(2) or '[^{}/]+'})")
+        pos = match.end()
+    pattern.append(re.escape(segment[pos:]))
+    return re.compile(''.join(pattern))
+class DynamicRouteTable:
+    """
+    热更新路由的分发表
 
-    # 如果都找不到，返回404
-    raise web.HTTPNotFound()
+    静态路径直接走哈希表；带参数的路径按段组织为前缀树，
+    每段先查静态子节点再尝试参数子节点，查找代价只与路径段数相关。
+    """
+    class _Node:
+        __slots__ = ("static", "params", "handlers")
+        def __init__(self):
+            self.static: dict = {}
+            self.params: dict = {}
+            self.handlers: dict = {}
+    def __init__(self):
+
+        self.__static: dict[str, dict] = {}
+        self.__root = self._Node()
+        self.__lock: threading.Lock = threading.Lock()
+        self.__count: int = 0
+    def __len__(self) -> int:
+        return self.__count
+    def __node_for(self, path: str, create: bool):
+
+        node = self.__root
+        segments = split_route_path(path)
+        for index, segment in enumerate(segments):
+            if '{' not in segment:
+                child = node.static.get(segment)
+                if child is None and create:
+                    child = node.static[segment] = self._Node()
+            else:
+                # 最后一段的自定义正则允许跨越 /（如 {path:.*}）
+                key = (segment, index == len(segments) - 1)
+                entry = node.params.get(key)
+                if entry is None and create:
+                    entry = node.params[key] = (compile_route_segment(segment), self._Node())
+                child = entry[1] if entry else None
+            if child is None:
+                return None
+            node = child
+        return node
+    def add(self, method: str, path: str, handler):
+
+        method = method.upper()
+        with self.__lock:
+            handlers = self.__static.setdefault(path, {}) if '{' not in path else self.__node_for(path, True).handlers
+            if method not in handlers:
+                self.__count += 1
+            handlers[method] = handler
+    def remove(self, method: str, path: str):
 
+        method = method.upper()
+        with self.__lock:
+            if '{' not in path:
+                handlers = self.__static.get(path)
+            else:
+                node = self.__node_for(path, False)
+                handlers = node.handlers if node else None
+            if handlers and handlers.pop(method, None) is not None:
+                self.__count -= 1
+                if not handlers and '{' not in path:
+                    del self.__static[path]
+    @staticmethod
+    def __pick(handlers: dict, method: str):
+        """按方法取 handler：精确匹配，其次 *，HEAD 回退到 GET"""
+        handler = handlers.get(method) or handlers.get("*")
+        if handler is None and method == "HEAD":
+            handler = handlers.get("GET")
+        return handler
+    def __match(self, node, segments: list[str], index: int, params: dict, method: str, allowed: set):
+        """
+        与 aiohttp 一致：路径匹配但不支持该方法的路由不终止查找，其方法记入 allowed 后继续尝试其他路由
+        """
+        if index == len(segments):
+            if node.handlers and self.__pick(node.handlers, method) is None:
+                allowed.update(node.handlers)
+                return None
+            return node.handlers if node.handlers else None
+        child = node.static.get(segments[index])
+        if child is not None:
+            found = self.__match(child, segments, index + 1, params, method, allowed)
+            if found is not None:
+                return found
+        for (_, is_tail), (pattern, child) in node.params.items():
+            if is_tail and not child.static and not child.params:
+                match = pattern.fullmatch('/'.join(segments[index:]))
+                if match and child.handlers:
+                    if self.__pick(child.handlers, method) is not None:
+                        params.update(match.groupdict())
+                        return child.handlers
+                    allowed.update(child.handlers)
+            match = pattern.fullmatch(segments[index])
+            if match:
+                found = self.__match(child, segments, index + 1, params, method, allowed)
+                if found is not None:
+                    params.update(match.groupdict())
+                    return found
+        return None
+    def resolve(self, method: str, path: str) -> tuple:
+        """
+        Returns:
+            (handler, 路径参数, 该路径允许的方法)；路径不存在时 handler 与允许方法均为 None，
+            路径存在但方法不被支持时 handler 为 None，允许方法为所有匹配路由的方法之和
+        """
+        params = {}
+        allowed = set()
+        handlers = self.__static.get(path)
+        if handlers is not None:
+            handler = self.__pick(handlers, method)
+            if handler is not None:
+                return handler, params, set(handlers.keys())
+            # 静态路径不支持该方法时继续尝试带参数的路由（如 POST /a/static 与 GET /a/{id}）
+            allowed.update(handlers)
+        handlers = self.__match(self.__root, split_route_path(path), 0, params, method, allowed)
+        if handlers:
+            return self.__pick(handlers, method), params, allowed | set(handlers.keys())
+        return None, {}, allowed or None
 # 存储动态路由映射
-DYNAMIC_API_ROUTES = {}
+DYNAMIC_API_ROUTES = DynamicRouteTable()
 
-def is_module_match(handler_module: str, module_name: str, sys_module_name: str = None) -> bool:
+def resolve_module_owner(handler) -> str:
     """
-    检查 handler 的模块名是否匹配目标模块
-
-    Args:
-        handler_module: handler.__module__ 的值
-        module_name: 模块名（如 "comfyui-clear-screen"）
-        sys_module_name: sys.modules 中的模块名（路径中的 "." 被替换为 "_x_"）
+    根据 handler 定义所在文件确定其所属节点包
 
     Returns:
-        是否匹配
+        custom_nodes 下的节点包名（目录名或单文件名），不属于任何节点包时返回 None
     """
-    if not handler_module:
-        return False
-
-    # 直接匹配
-    if module_name == handler_module:
-        return True
-
-    # 匹配 sys_module_name（如果提供）
-    if sys_module_name and sys_module_name == handler_module:
-        return True
-
-    # 匹配各种路径格式
-    patterns = [
-        f"custom_nodes.{module_name}",
-        f"custom_nodes\\{module_name}",
-        f"custom_nodes/{module_name}",
-        f"\\{module_name}",
-        f"/{module_name}",
-    ]
-
-    for pattern in patterns:
-        if handler_module.endswith(pattern) or pattern in handler_module:
-            return True
+    module = sys.modules.get(getattr(handler, '__module__', None) or '')
+    file_path = getattr(module, '__file__', None)
+    if not file_path:
+        return None
+    try:
+        relative_path = os.path.relpath(os.path.abspath(file_path), CUSTOM_NODE_ROOT[0])
+    except ValueError:
+        return None
+    if relative_path.startswith(os.pardir):
+        return None
+    return relative_path.split(os.path.sep)[0]
+ROUTE_PARAM_PATTERN = re.compile(r"\{(\w+):[^{}]*(?:\{[^{}]*\}[^{}]*)*\}")
+def canonical_route_path(path: str) -> str:
+    """/foo/{id:\\d+} -> /foo/{id}，与 aiohttp resource.canonical 一致"""
+    return ROUTE_PARAM_PATTERN.sub(r"{\1}", path)
+def route_key(route) -> tuple[str, str]:
+    """(METHOD, 规范路径)，不是普通路由定义（如静态目录）时返回 None"""
+    if not (hasattr(route, 'method') and hasattr(route, 'path') and hasattr(route, 'handler')):
+        return None
+    return route.method.upper(), canonical_route_path(route.path)
+def removed_route_handler(module_name: str, method: str, path: str):
+    """新版本不再定义的路由在 router 中的占位 handler"""
+    async def removed_route(request):
+        raise web.HTTPNotFound(text=f"{method} {path} was removed by the last reload of {module_name}")
+    return removed_route
+class RouteOwnershipIndex:
+    """
+    路由归属索引：节点包 -> 路由定义，资源路径 -> aiohttp 资源
 
-    # 如果 sys_module_name 提供了，也检查它的各种格式
-    if sys_module_name:
-        if sys_module_name in handler_module or handler_module in sys_module_name:
-            return True
+    启动后首次使用时建立，之后只对新增的路由/资源做增量索引，
+    重载时的路由清理和 handler 替换都是字典查找。
+    """
+    def __init__(self):
+
+        self.__routes: defaultdict[str, list] = defaultdict(list)
+        self.__handler_owners: dict = {}
+        self.__resources: defaultdict[str, list] = defaultdict(list)
+        self.__indexed_routes: int = 0
+        self.__indexed_resources: int = 0
+        self.__lock: threading.RLock = threading.RLock()
+    def sync_routes(self):
+        """索引 PromptServer.instance.routes 中尚未索引的路由"""
+        with self.__lock:
+            items = PromptServer.instance.routes._items
+            for route in items[self.__indexed_routes:]:
+                handler = getattr(route, 'handler', None)
+                owner = resolve_module_owner(handler) if handler is not None else None
+                if owner:
+                    self.__routes[owner].append(route)
+                    self.__handler_owners[handler] = owner
+            self.__indexed_routes = len(items)
+    def sync_router(self):
+        """索引 aiohttp router 中尚未索引的资源"""
+        app = getattr(PromptServer.instance, 'app', None)
+        if not app:
+            return
+        with self.__lock:
+            resources = app.router._resources
+            for resource in resources[self.__indexed_resources:]:
+                resource_path = getattr(resource, 'canonical', None) or getattr(resource, '_path', None)
+                if resource_path:
+                    self.__resources[resource_path].append(resource)
+            self.__indexed_resources = len(resources)
+    def routes_of(self, module_name: str) -> list:
+
+        return list(self.__routes.get(module_name, ()))
+    def owner_of(self, handler) -> str:
+
+        owner = self.__handler_owners.get(handler)
+        return owner if owner is not None else resolve_module_owner(handler)
+    def select_module_routes(self, module_name: str, purged_modules: set[str] = None) -> list:
+        """
+        选出节点包中需要被替换的路由（只读，不修改路由表）
+
+        Args:
+            module_name: 节点包名
+            purged_modules: 只选择 handler 定义在这些模块中的路由（增量重载），None 表示全部
+        """
+        with self.__lock:
+            self.sync_routes()
+            return [
+                route for route in self.__routes.get(module_name, ())
+                if purged_modules is None or getattr(getattr(route, 'handler', None), '__module__', None) in purged_modules
+            ]
+    def __drop(self, routes_by_module: dict[str, list]):
+        """按对象身份从 RouteTableDef 中移除多个节点包的路由，整个路由表只遍历一次"""
+        removed_ids = {id(route) for routes in routes_by_module.values() for route in routes}
+        if not removed_ids:
+            return
+        for module_name in routes_by_module:
+            kept = [route for route in self.__routes.pop(module_name, []) if id(route) not in removed_ids]
+            if kept:
+                self.__routes[module_name] = kept
+        items = PromptServer.instance.routes._items
+        # 由于RouteTableDef不支持直接删除路由，直接替换_items内容
+        items[:] = [route for route in items if id(route) not in removed_ids]
+        self.__indexed_routes = len(items)
+    def remove_routes(self, module_name: str, routes: list) -> int:
+        """
+        按对象身份从 RouteTableDef 中移除路由
+
+        旧 handler 的归属记录保留到 release_handlers，供随后的 router handler 替换使用。
+        """
+        if not routes:
+            return 0
+        with self.__lock:
+            self.sync_routes()
+            self.__drop({module_name: routes})
+            return len(routes)
+    def apply(self, changes: list[tuple[str, list, list]]) -> dict[str, dict[str, int]]:
+        """
+        把一批节点包的路由变化按差量一次应用到 RouteTableDef 和 aiohttp router
+
+        旧路由从路由表中一次移除；router 中新旧版本都定义的路由替换 handler，
+        新版本不再定义的路由换成返回 404 的占位 handler（router 启动后已冻结，无法删除资源）。
+        新增的路由由动态路由表提供，见 register_module_routes。
+
+        Args:
+            changes: [(节点包名, 被替换的旧路由, 新版本注册的路由)]
+        Returns:
+            {节点包名: {"added": 新增数, "replaced": 替换数, "removed": 移除数}}
+        """
+        summary = {}
+        with self.__lock:
+            self.sync_routes()
+            self.__drop({module_name: old_routes for module_name, old_routes, _ in changes})
+            self.sync_router()
+            for module_name, old_routes, new_routes in changes:
+                old_keys = {key for key in map(route_key, old_routes) if key is not None}
+                handlers = {}
+                for route in new_routes:
+                    key = route_key(route)
+                    if key is not None and self.owner_of(route.handler) == module_name:
+                        handlers[key] = route.handler
+                summary[module_name] = {
+                    "added": len(handlers.keys() - old_keys),
+                    "replaced": len(handlers.keys() & old_keys),
+                    "removed": len(old_keys - handlers.keys()),
+                }
+                for key in old_keys - handlers.keys():
+                    handlers[key] = removed_route_handler(module_name, *key)
+                for (method, path), handler in handlers.items():
+                    # add_get 会同时注册 HEAD，两者一起替换
+                    methods = (method, "HEAD") if method == "GET" else (method,)
+                    # 匹配路径（包括 /api 前缀的版本）
+                    for resource_path in (path, f"/api{path}"):
+                        for resource in self.__resources.get(resource_path, ()):
+                            for route_obj in resource:
+                                if getattr(route_obj, 'method', None) not in methods or not hasattr(route_obj, '_handler'):
+                                    continue
+                                if self.owner_of(route_obj.handler) == module_name:
+                                    # 直接替换 handler（保留路由缓存结构）
+                                    route_obj._handler = handler
+                                    self.__handler_owners[handler] = module_name
+        return summary
+    def release_handlers(self, routes: list):
 
-    return False
+        with self.__lock:
+            for route in routes:
+                self.__handler_owners.pop(getattr(route, 'handler', None), None)
+ROUTE_INDEX = RouteOwnershipIndex()
 
-@PromptServer.instance.routes.get("/api/{path:.*}")
+@PromptServer.instance.routes.route("*", "/api/{path:.*}")
 async def dynamic_api_handler(request):
-    """动态处理热更新的API路由"""
+    """动态处理热更新的API路由（所有 HTTP 方法，支持带参数的路径）"""
     path = "/" + request.match_info['path']  # 重构完整路径
     method = request.method.upper()
     
     # 查找动态注册的处理器
-    route_key = f"{method}:{path}"
-    if route_key in DYNAMIC_API_ROUTES:
-        handler = DYNAMIC_API_ROUTES[route_key]
+    handler, params, allowed_methods = DYNAMIC_API_ROUTES.resolve(method, path)
+    if handler is not None:
+        request.match_info.update(params)
         return await handler(request)
+    if allowed_methods:
+        raise web.HTTPMethodNotAllowed(method, allowed_methods)
     
     # 如果没找到动态路由，让系统继续处理
     raise web.HTTPNotFound()
 
-def register_module_routes(module_name, sys_module_name=None):
-    """注册模块的所有路由到动态路由表"""
-    # 清理旧路由 - 从 DYNAMIC_API_ROUTES（通过模块路径匹配）
-    keys_to_remove = []
-    for route_key, handler in DYNAMIC_API_ROUTES.items():
-        if hasattr(handler, '__module__'):
-            handler_module = handler.__module__
-            # 使用统一的匹配函数
-            if is_module_match(handler_module, module_name, sys_module_name):
-                keys_to_remove.append(route_key)
-
-    for key in keys_to_remove:
-        del DYNAMIC_API_ROUTES[key]
-
-    # 注册新路由到动态路由表
-    registered_count = 0
-    for route in PromptServer.instance.routes:
-        if hasattr(route, 'handler') and hasattr(route.handler, '__module__'):
-            handler_module = route.handler.__module__
-            # 使用统一的匹配函数
-            if is_module_match(handler_module, module_name, sys_module_name):
-                route_key = f"{route.method}:{route.path}"
-                DYNAMIC_API_ROUTES[route_key] = route.handler
-                registered_count += 1
+# 每个节点包注册到动态路由表中的 (method, path)
+DYNAMIC_API_ROUTE_KEYS: defaultdict[str, set[tuple[str, str]]] = defaultdict(set)
+
+def register_module_routes(module_name):
+    """把模块的路由同步到动态路由表：新增/替换的直接写入，新版本不再定义的移除"""
+    ROUTE_INDEX.sync_routes()
+    keys = set()
+    for route in ROUTE_INDEX.routes_of(module_name):
+        if hasattr(route, 'method') and hasattr(route, 'path') and hasattr(route, 'handler'):
+            DYNAMIC_API_ROUTES.add(route.method, route.path, route.handler)
+            keys.add((route.method.upper(), route.path))
+
+    # 清理旧版本独有的路由
+    for method, path in DYNAMIC_API_ROUTE_KEYS.pop(module_name, set()) - keys:
+        DYNAMIC_API_ROUTES.remove(method, path)
+    if keys:
+        DYNAMIC_API_ROUTE_KEYS[module_name] = keys
 
 
 if (HOTRELOAD_EXCLUDE := os.getenv("HOTRELOAD_EXCLUDE", None)) is not None:
     EXCLUDE_MODULES.update(x for x in HOTRELOAD_EXCLUDE.split(',') if x)
 HOTRELOAD_OBSERVE_ONLY: set[str] = set(x for x in os.getenv("HOTRELOAD_OBSERVE_ONLY", '').split(',') if x)
 HOTRELOAD_EXTENSIONS: set[str] = set(x.strip() for x in os.getenv("HOTRELOAD_EXTENSIONS", '.py').split(',') if x)
+# 节点包 WEB_DIRECTORY 中的前端资源：变更时只通知浏览器重新加载该文件，不触发 Python 重载
+HOTRELOAD_WEB_EXTENSIONS: tuple[str, ...] = tuple(x.strip() for x in os.getenv("HOTRELOAD_WEB_EXTENSIONS", '.js,.css').split(',') if x.strip())
 try:
     DEBOUNCE_TIME: float = float(os.getenv("HOTRELOAD_DEBOUNCE_TIME", 1.0))
 except ValueError:
     DEBOUNCE_TIME = 1.0
+# 增量重载：只清理变更模块及其反向依赖，HOTRELOAD_INCREMENTAL=0 时回退为整包重载
+HOTRELOAD_INCREMENTAL: bool = os.getenv("HOTRELOAD_INCREMENTAL", "1").strip().lower() not in ("0", "false", "no")
+# 文件监听后端: auto（优先系统原生 inotify/FSEvents/ReadDirectoryChangesW，失败时回退轮询）、native、polling
+HOTRELOAD_OBSERVER: str = os.getenv("HOTRELOAD_OBSERVER", "auto").strip().lower()
+try:
+    POLLING_INTERVAL: float = float(os.getenv("HOTRELOAD_POLLING_INTERVAL", 1.0))
+except ValueError:
+    POLLING_INTERVAL = 1.0
+# 导入耗时分析（默认关闭，也可以在设置对话框中开启）
+HOTRELOAD_PROFILE_IMPORTS: bool = os.getenv("HOTRELOAD_PROFILE_IMPORTS", "0").strip().lower() in ("1", "true", "yes")
+try:
+    HOTRELOAD_PROFILE_HISTORY: int = max(1, int(os.getenv("HOTRELOAD_PROFILE_HISTORY", 10)))
+except ValueError:
+    HOTRELOAD_PROFILE_HISTORY = 10
+# 重载后回收旧版本模块（gc.collect + 释放显存缓存），HOTRELOAD_GC=0 关闭
+HOTRELOAD_GC: bool = os.getenv("HOTRELOAD_GC", "1").strip().lower() not in ("0", "false", "no")
+# 重载日志：文件指纹与重载结果写入 reload_journal.jsonl，重启后据此跳过未变化文件的哈希计算
+HOTRELOAD_JOURNAL: bool = os.getenv("HOTRELOAD_JOURNAL", "1").strip().lower() not in ("0", "false", "no")
+# 预检：重载前在子进程中编译变更的文件；HOTRELOAD_PREFLIGHT_IMPORT=1 时额外在一次性子进程中试导入整个节点包
+HOTRELOAD_PREFLIGHT: bool = os.getenv("HOTRELOAD_PREFLIGHT", "1").strip().lower() not in ("0", "false", "no")
+HOTRELOAD_PREFLIGHT_IMPORT: bool = os.getenv("HOTRELOAD_PREFLIGHT_IMPORT", "0").strip().lower() in ("1", "true", "yes")
+try:
+    HOTRELOAD_PREFLIGHT_WORKERS: int = max(1, int(os.getenv("HOTRELOAD_PREFLIGHT_WORKERS", min(4, os.cpu_count() or 1))))
+except ValueError:
+    HOTRELOAD_PREFLIGHT_WORKERS = min(4, os.cpu_count() or 1)
+try:
+    HOTRELOAD_PREFLIGHT_TIMEOUT: float = float(os.getenv("HOTRELOAD_PREFLIGHT_TIMEOUT", 60))
+except ValueError:
+    HOTRELOAD_PREFLIGHT_TIMEOUT = 60.0
+# 同时处理的节点包数量上限
+try:
+    HOTRELOAD_MAX_PARALLEL: int = max(1, int(os.getenv("HOTRELOAD_MAX_PARALLEL", 2)))
+except ValueError:
+    HOTRELOAD_MAX_PARALLEL = 2
+class LatencyHistogram:
+    """固定分桶的耗时直方图（秒）"""
+    BUCKETS: tuple[float, ...] = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+    def __init__(self):
+
+        self.counts: list[int] = [0] * (len(self.BUCKETS) + 1)
+        self.count: int = 0
+        self.sum: float = 0.0
+        self.max: float = 0.0
+    def observe(self, seconds: float):
+
+        self.counts[bisect.bisect_left(self.BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+    def cumulative(self) -> list[tuple[str, int]]:
+        """Prometheus 风格的累计分桶 [(le, count)]"""
+        result, total = [], 0
+        for bound, count in zip(self.BUCKETS + (float('inf'),), self.counts):
+            total += count
+            result.append(("+Inf" if bound == float('inf') else repr(bound), total))
+        return result
+    def to_dict(self) -> dict:
+
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "avg": self.sum / self.count if self.count else 0.0,
+            "max": self.max,
+            "buckets": dict(self.cumulative()),
+        }
+class ReloadStats:
+    """
+    重载各阶段的耗时统计（内存中）
+
+    phase: event_to_schedule（文件事件到入队）、debounce_wait（首个事件到开始重载）、
+    preflight（子进程编译/试导入）、route_cleanup（路由表与 router 的差量更新）、module_purge、import（load_custom_node）、
+    validate、router_sync（节点映射与动态路由表）、
+    cache_invalidation、notify、gc（回收旧版本）、total（单次重载总耗时）
+    """
+    PHASES: tuple[str, ...] = (
+        "event_to_schedule", "debounce_wait", "route_cleanup", "module_purge", "import",
+        "preflight", "validate", "router_sync", "cache_invalidation", "notify", "gc", "total",
+    )
+
+    def __init__(self):
+
+        self.__lock: threading.Lock = threading.Lock()
+        self.__phases: dict[str, LatencyHistogram] = {phase: LatencyHistogram() for phase in self.PHASES}
+        # 节点包 -> 累计耗时，用于找出拖慢开发循环的节点包
+        self.__modules: dict[str, dict] = {}
+    def observe(self, phase: str, seconds: float, module_name: str = None):
+
+        with self.__lock:
+            histogram = self.__phases.get(phase)
+            if histogram is None:
+                histogram = self.__phases[phase] = LatencyHistogram()
+            histogram.observe(seconds)
+            if module_name is None:
+                return
+            entry = self.__modules.get(module_name)
+            if entry is None:
+                entry = self.__modules[module_name] = {"reloads": 0, "total": 0.0, "max": 0.0, "last": 0.0, "phases": {}}
+            entry["phases"][phase] = entry["phases"].get(phase, 0.0) + seconds
+            if phase == "total":
+                entry["reloads"] += 1
+                entry["total"] += seconds
+                entry["max"] = max(entry["max"], seconds)
+                entry["last"] = seconds
+    def snapshot(self) -> dict:
+
+        with self.__lock:
+            return {
+                "phases": {phase: histogram.to_dict() for phase, histogram in self.__phases.items()},
+                "modules": {
+                    name: dict(entry, phases=dict(entry["phases"]))
+                    for name, entry in sorted(self.__modules.items(), key=lambda x: x[1]["total"], reverse=True)
+                },
+            }
+    def prometheus(self, stats: dict) -> str:
+        """Prometheus 文本格式（直方图 + 节点包累计值 + 其他统计的数值项）"""
+        def label(value) -> str:
+            return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+        lines = [
+            "# HELP hotreload_phase_seconds Time spent in each hot reload phase.",
+            "# TYPE hotreload_phase_seconds histogram",
+        ]
+        with self.__lock:
+            for phase, histogram in self.__phases.items():
+                for le, count in histogram.cumulative():
+                    lines.append(f'hotreload_phase_seconds_bucket{{phase="{label(phase)}",le="{le}"}} {count}')
+                lines.append(f'hotreload_phase_seconds_sum{{phase="{label(phase)}"}} {histogram.sum}')
+                lines.append(f'hotreload_phase_seconds_count{{phase="{label(phase)}"}} {histogram.count}')
+            lines.append("# HELP hotreload_module_reload_seconds_total Total reload time per node pack.")
+            lines.append("# TYPE hotreload_module_reload_seconds_total counter")
+            for name, entry in self.__modules.items():
+                lines.append(f'hotreload_module_reload_seconds_total{{module="{label(name)}"}} {entry["total"]}')
+            lines.append("# HELP hotreload_module_reloads_total Number of reloads per node pack.")
+            lines.append("# TYPE hotreload_module_reloads_total counter")
+            for name, entry in self.__modules.items():
+                lines.append(f'hotreload_module_reloads_total{{module="{label(name)}"}} {entry["reloads"]}')
+        for group in ("queue", "fingerprints", "cache"):
+            for key, value in (stats.get(group) or {}).items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    lines.append(f"hotreload_{group}_{key} {value}")
+        return "\n".join(lines) + "\n"
+RELOAD_STATS = ReloadStats()
+class ImportProfiler:
+    """
+    重载单个节点包时的导入耗时树（类似 -X importtime，但只记录重载线程内的导入）
+
+    重载期间临时替换 builtins.__import__，记录每次导入的累计与自身耗时，
+    结束后恢复并保存最近 history 份结果。
+    """
+    # 小于该值（秒）且没有子节点的导入不进入结果树
+    MIN_DURATION: float = 0.0005
+
+    def __init__(self, enabled: bool = False, history: int = 10):
+
+        self.enabled: bool = enabled
+        self.__profiles: deque = deque(maxlen=history)
+        self.__lock: threading.Lock = threading.Lock()
+    def profiles(self) -> list[dict]:
+        """最近的分析结果，最新的在前"""
+        with self.__lock:
+            return list(reversed(self.__profiles))
+    def clear(self):
+
+        with self.__lock:
+            self.__profiles.clear()
+    @staticmethod
+    def __resolve_name(name: str, globals_, level: int) -> str:
+
+        if level <= 0:
+            return name
+        try:
+            package = (globals_ or {}).get('__package__') or (globals_ or {}).get('__name__', '')
+            return importlib.util.resolve_name('.' * level + name, package)
+        except Exception:
+            return '.' * level + name
+    @contextlib.contextmanager
+    def profile(self, module_name: str, module_path: str):
+
+        if not self.enabled:
+            yield
+            return
+        original_import = builtins.__import__
+        thread_id = threading.get_ident()
+        root = {"module": module_name, "local": True, "self": 0.0, "cumulative": 0.0, "children": []}
+        stack = [root]
+        module_prefix = module_path if os.path.isfile(module_path) else os.path.join(module_path, '')
+        resolve_name = self.__resolve_name
+        min_duration = self.MIN_DURATION
+
+        def profiled_import(name, globals=None, locals=None, fromlist=(), level=0):
+            if threading.get_ident() != thread_id:
+                return original_import(name, globals, locals, fromlist, level)
+            node = {"module": resolve_name(name, globals, level), "self": 0.0, "cumulative": 0.0, "children": []}
+            stack.append(node)
+            started = time.perf_counter()
+            try:
+                result = original_import(name, globals, locals, fromlist, level)
+            finally:
+                stack.pop()
+                node["cumulative"] = time.perf_counter() - started
+                node["self"] = node["cumulative"] - sum(x["cumulative"] for x in node["children"])
+                if node["cumulative"] >= min_duration or node["children"]:
+                    module_file = getattr(sys.modules.get(node["module"]), '__file__', None) or ''
+                    node["local"] = module_file.startswith(module_prefix)
+                    stack[-1]["children"].append(node)
+            return result
+
+        builtins.__import__ = profiled_import
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            if builtins.__import__ is profiled_import:
+                builtins.__import__ = original_import
+            root["cumulative"] = time.perf_counter() - started
+            root["self"] = root["cumulative"] - sum(x["cumulative"] for x in root["children"])
+            self.__record(module_name, root)
+    def __record(self, module_name: str, root: dict):
+
+        flat, pending = [], list(root["children"])
+        while pending:
+            node = pending.pop()
+            flat.append(node)
+            pending.extend(node["children"])
+        # 自身耗时最多的导入，通常就是适合改为延迟导入的目标
+        top = sorted(flat, key=lambda x: x["self"], reverse=True)[:10]
+        with self.__lock:
+            self.__profiles.append({
+                "module": module_name,
+                "timestamp": time.time(),
+                "duration": root["cumulative"],
+                "tree": root,
+                "top": [{"module": x["module"], "self": x["self"], "cumulative": x["cumulative"], "local": x["local"]} for x in top],
+            })
+        print(f'\033[96m[LG_HotReload] 导入耗时分析: {module_name} {root["cumulative"]*1000:.1f}ms，最慢: ' +
+              ', '.join(f'{x["module"]} {x["self"]*1000:.1f}ms' for x in top[:3]) + '\033[0m')
+IMPORT_PROFILER = ImportProfiler(HOTRELOAD_PROFILE_IMPORTS, HOTRELOAD_PROFILE_HISTORY)
+class ModuleGenerationTracker:
+    """
+    记录每次重载被替换下来的旧版本（模块、节点类）的弱引用
+
+    切换完成后执行一次 GC，仍然存活的旧版本即为泄漏，可以通过 /hotreload/leaks 查看引用链。
+    """
+    MAX_GENERATIONS: int = 50
+
+    def __init__(self):
+
+        self.__lock: threading.Lock = threading.Lock()
+        self.__generations: deque = deque(maxlen=self.MAX_GENERATIONS)
+        self.__counter: int = 0
+        self.retired: int = 0
+        self.collected: int = 0
+    def retire(self, module_name: str, modules: dict, classes: dict):
+        """登记被替换下来的旧模块与旧节点类（只保存弱引用）"""
+        refs, seen = [], set()
+        for kind, objects in (("module", modules), ("class", classes)):
+            for name, obj in objects.items():
+                if obj is None or id(obj) in seen:
+                    continue
+                seen.add(id(obj))
+                try:
+                    refs.append((kind, name, weakref.ref(obj)))
+                except TypeError:
+                    continue
+        if not refs:
+            return
+        with self.__lock:
+            self.__counter += 1
+            self.retired += len(refs)
+            self.__generations.append({
+                "module": module_name,
+                "generation": self.__counter,
+                "retired_at": time.time(),
+                "refs": refs,
+            })
+    def reclaim(self, module_name: str = None) -> int:
+        """执行 GC 并释放显存缓存，返回仍未回收的旧对象数量"""
+        started = time.perf_counter()
+        gc.collect()
+        try:
+            import comfy.model_management
+            comfy.model_management.soft_empty_cache()
+        except Exception:
+            pass
+        alive = self.__prune()
+        RELOAD_STATS.observe("gc", time.perf_counter() - started, module_name)
+        if alive:
+            print(f'\033[93m[LG_HotReload] {alive} 个旧版本模块/类在重载后仍未被回收，引用链见 /hotreload/leaks\033[0m')
+        return alive
+    def __prune(self) -> int:
+        """丢弃已完全回收的代，返回仍存活的对象数量"""
+        alive = 0
+        with self.__lock:
+            kept = []
+            for generation in self.__generations:
+                refs = [x for x in generation["refs"] if x[2]() is not None]
+                self.collected += len(generation["refs"]) - len(refs)
+                if refs:
+                    generation["refs"] = refs
+                    kept.append(generation)
+                    alive += len(refs)
+            self.__generations.clear()
+            self.__generations.extend(kept)
+        return alive
+    @staticmethod
+    def __describe(obj, module_dicts: dict) -> str:
+
+        if isinstance(obj, types.ModuleType):
+            return f"module {obj.__name__}"
+        if isinstance(obj, dict) and id(obj) in module_dicts:
+            return f"module {module_dicts[id(obj)]}.__dict__"
+        if isinstance(obj, dict) and '__builtins__' in obj and isinstance(obj.get('__name__'), str):
+            # 模块对象已回收但全局字典仍被函数的 __globals__ 引用
+            return f"globals of {obj['__name__']}"
+        if isinstance(obj, type):
+            return f"class {obj.__module__}.{obj.__qualname__}"
+        if isinstance(obj, types.FunctionType):
+            return f"function {obj.__module__}.{obj.__qualname__}"
+        if isinstance(obj, types.MethodType):
+            return f"bound method {getattr(obj.__func__, '__qualname__', '?')}"
+        if isinstance(obj, types.CellType):
+            return "closure cell"
+        if isinstance(obj, (dict, list, tuple, set)):
+            return f"{type(obj).__name__} (len {len(obj)})"
+        return f"{type(obj).__module__}.{type(obj).__qualname__} object"
+    def __referrer_chains(self, obj, depth: int, module_dicts: dict, ignored: set) -> list[list[str]]:
+        """沿 gc.get_referrers 向上查找引用链，每层最多展开几个引用者"""
+        chains = []
+        def walk(target, chain, level):
+            referrers = [
+                x for x in gc.get_referrers(target)
+                if id(x) not in ignored and not isinstance(x, (types.FrameType, types.GetSetDescriptorType, types.MemberDescriptorType))
+            ][:4]
+            ignored.add(id(referrers))
+            if level >= depth or not referrers:
+                chains.append(chain)
+                return
+            for referrer in referrers:
+                ignored.add(id(referrer))
+                description = self.__describe(referrer, module_dicts)
+                # 仍在 sys.modules 中的模块是引用链的根
+                if isinstance(referrer, dict) and id(referrer) in module_dicts or isinstance(referrer, types.ModuleType):
+                    chains.append(chain + [description])
+                else:
+                    walk(referrer, chain + [description], level + 1)
+        walk(obj, [], 0)
+        return chains[:10]
+    def leaks(self, depth: int = 3) -> dict:
+
+        gc.collect()
+        self.__prune()
+        module_dicts = {id(module.__dict__): name for name, module in list(sys.modules.items()) if module is not None}
+        with self.__lock:
+            generations = [dict(x, refs=list(x["refs"])) for x in self.__generations]
+        # 分析过程中产生的容器与旧版本自身的结构（__mro__、__dict__）不计入引用链
+        ignored = {id(generations), id(module_dicts)}
+        for generation in generations:
+            ignored.add(id(generation))
+            ignored.add(id(generation["refs"]))
+        report = []
+        for generation in generations:
+            objects = []
+            for kind, name, ref in generation["refs"]:
+                obj = ref()
+                if obj is None:
+                    continue
+                own = {id(getattr(obj, '__mro__', None)), id(getattr(obj, '__dict__', None))}
+                objects.append({
+                    "kind": kind,
+                    "name": name,
+                    "referrers": self.__referrer_chains(obj, depth, module_dicts, ignored | own),
+                })
+                del obj
+            if objects:
+                report.append({
+                    "module": generation["module"],
+                    "generation": generation["generation"],
+                    "retired_at": generation["retired_at"],
+                    "objects": objects,
+                })
+        return {"retired": self.retired, "collected": self.collected, "leaked": report}
+MODULE_GENERATIONS = ModuleGenerationTracker()
 def hash_file(file_path: str) -> str:
 
     try:
         with open(file_path, 'rb') as f:
-            return hashlib.md5(f.read()).hexdigest()
+            return hashlib.blake2b(f.read(), digest_size=16).hexdigest()
     except Exception as e:
         logging.error(f"Error reading file {file_path}: {e}")
         return None
+class FileFingerprintCache:
+    """按路径缓存文件内容指纹；mtime/size 未变化时直接命中，不重新读取文件"""
+    def __init__(self):
+
+        self.__entries: dict[str, tuple[int, int, str]] = {}
+        self.__lock: threading.Lock = threading.Lock()
+        self.hits: int = 0
+        self.misses: int = 0
+        # on_change(file_path, (mtime_ns, size, digest) 或 None)，用于写入重载日志
+        self.on_change = None
+    def __contains__(self, file_path: str) -> bool:
+        return file_path in self.__entries
+    def __len__(self) -> int:
+        return len(self.__entries)
+    def fingerprint(self, file_path: str, st: os.stat_result = None) -> str:
+        """返回文件内容指纹并更新缓存，文件不可读时返回 None"""
+        if st is None:
+            try:
+                st = os.stat(file_path)
+            except OSError:
+                self.forget(file_path)
+                return None
+        entry = self.__entries.get(file_path)
+        if entry and entry[0] == st.st_mtime_ns and entry[1] == st.st_size:
+            return entry[2]
+        digest = hash_file(file_path)
+        if digest is not None:
+            entry = (st.st_mtime_ns, st.st_size, digest)
+            with self.__lock:
+                self.__entries[file_path] = entry
+            if self.on_change is not None:
+                self.on_change(file_path, entry)
+        return digest
+    def check(self, file_path: str) -> str:
+        """
+        检查文件内容是否相对上次记录发生变化
+
+        Returns:
+            "added" / "modified" / "deleted"；内容与缓存一致时返回 None
+        """
+        try:
+            st = os.stat(file_path)
+        except OSError:
+            self.forget(file_path)
+            with self.__lock:
+                self.misses += 1
+            return "deleted"
+        entry = self.__entries.get(file_path)
+        if entry and entry[0] == st.st_mtime_ns and entry[1] == st.st_size:
+            with self.__lock:
+                self.hits += 1
+            return None
+        digest = self.fingerprint(file_path, st)
+        with self.__lock:
+            if entry and digest is not None and entry[2] == digest:
+                self.hits += 1
+                return None
+            self.misses += 1
+        return "modified" if entry else "added"
+    def forget(self, file_path: str) -> bool:
+
+        with self.__lock:
+            removed = self.__entries.pop(file_path, None) is not None
+        if removed and self.on_change is not None:
+            self.on_change(file_path, None)
+        return removed
+    def forget_missing(self, prefix: str, seen: set[str]):
+        """移除 prefix 下本次遍历未出现的条目（服务器停止期间被删除的文件）"""
+        with self.__lock:
+            missing = [x for x in self.__entries if x.startswith(prefix) and x not in seen]
+        for file_path in missing:
+            self.forget(file_path)
+    def warm(self, entries: dict[str, tuple[int, int, str]]):
+        """用重载日志中的指纹预填缓存，mtime/size 一致的文件不再重新哈希"""
+        with self.__lock:
+            for file_path, entry in entries.items():
+                self.__entries.setdefault(file_path, entry)
+    def entries(self) -> dict[str, tuple[int, int, str]]:
+
+        with self.__lock:
+            return dict(self.__entries)
+    def stats(self) -> dict:
+
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self.__entries)}
+FILE_FINGERPRINTS = FileFingerprintCache()
+# 扫描时直接跳过的目录（虚拟环境、缓存、版本库等）
+PRUNED_DIR_NAMES: set[str] = {
+    "__pycache__", ".git", ".hg", ".svn", "node_modules", "venv", ".venv", "env",
+    ".tox", ".mypy_cache", ".pytest_cache", ".ruff_cache", "site-packages",
+}
+def is_pruned_dir(name: str) -> bool:
+
+    return name.startswith('.') or name in PRUNED_DIR_NAMES
+def is_pruned_path(relative_path: str) -> bool:
+    """相对 custom_nodes 根目录的路径是否位于被裁剪的目录中"""
+    return any(is_pruned_dir(part) for part in relative_path.split(os.path.sep)[:-1])
+def is_watched_extension(file_path: str) -> bool:
+
+    if any(ext == '*' for ext in HOTRELOAD_EXTENSIONS):
+        return True
+    return any(file_path.endswith(ext) for ext in HOTRELOAD_EXTENSIONS)
+def is_module_observed(module_name: str) -> bool:
+    """节点包是否应被监听（综合 HOTRELOAD_OBSERVE_ONLY 与排除列表）"""
+    if not module_name or is_pruned_dir(module_name):
+        return False
+    if HOTRELOAD_OBSERVE_ONLY and module_name not in HOTRELOAD_OBSERVE_ONLY:
+        return False
+    return module_name not in EXCLUDE_MODULES
+def pruned_listdir(path: str) -> list[os.DirEntry]:
+    """轮询快照使用的 listdir：跳过被裁剪的目录以及不关心的文件类型（前端资源也需要保留）"""
+    # watchdog 的 DirectorySnapshot 需要 os.scandir 一样返回 DirEntry
+    entries = []
+    with os.scandir(path) as it:
+        for entry in it:
+            try:
+                is_dir = entry.is_dir(follow_symlinks=False)
+            except OSError:
+                continue
+            if is_dir:
+                if not is_pruned_dir(entry.name):
+                    entries.append(entry)
+            elif is_watched_extension(entry.name) or entry.name.endswith(HOTRELOAD_WEB_EXTENSIONS):
+                entries.append(entry)
+    return entries
+class NodePackInventory:
+    """
+    custom_nodes 下节点包的内存清单（目录名 -> 元数据）
+
+    由文件监听在目录增删时增量维护，/hotreload/get_all_modules 直接读取，不再每次遍历目录。
+    元数据: package（是否含 __init__.py）、files（监听的文件数）、status、last_reload、last_duration、reloads
+    """
+    def __init__(self):
+
+        self.__lock: threading.Lock = threading.Lock()
+        self.__packs: dict[str, dict] = {}
+        self.__version: int = 0
+        self.populated: bool = False
+        # 进程重启后 ETag 不与之前的重复
+        self.__epoch: str = f"{int(time.time()):x}"
+    def __changed(self):
+
+        self.__version += 1
+    def __new_entry(self, name: str) -> dict:
+
+        path = os.path.join(CUSTOM_NODE_ROOT[0], name)
+        # 上次运行时的最近一次重载记录
+        last = RELOAD_JOURNAL.last_reload(name) or {}
+        return {
+            "package": os.path.exists(os.path.join(path, '__init__.py')),
+            "files": None,
+            "status": "loaded" if name in getattr(nodes, 'LOADED_MODULE_DIRS', {}) else "unknown",
+            "last_reload": last.get("t"),
+            "last_duration": last.get("d"),
+            "reloads": 0,
+        }
+    def refresh(self, entries: list[str] = None):
+        """按目录列表同步清单：消失的目录移除，新目录加入，已有条目保留元数据"""
+        root = CUSTOM_NODE_ROOT[0]
+        if entries is None:
+            try:
+                entries = os.listdir(root)
+            except OSError as e:
+                print(f"\033[91m[LG_HotReload] Failed to list {root}: {e}\033[0m")
+                return
+        names = {x for x in entries if not x.startswith('.')}
+        with self.__lock:
+            known = set(self.__packs)
+        added = {
+            name: self.__new_entry(name) for name in names - known
+            if os.path.isdir(os.path.join(root, name))
+        }
+        with self.__lock:
+            removed = [name for name in self.__packs if name not in names]
+            for name in removed:
+                del self.__packs[name]
+            self.__packs.update(added)
+            if added or removed:
+                self.__changed()
+            self.populated = True
+    def update(self, name: str, **fields):
+
+        with self.__lock:
+            entry = self.__packs.get(name)
+            if entry is None:
+                return
+            entry.update(fields)
+            self.__changed()
+    def adjust_files(self, name: str, delta: int):
+
+        with self.__lock:
+            entry = self.__packs.get(name)
+            if entry is None or entry["files"] is None:
+                return
+            entry["files"] = max(0, entry["files"] + delta)
+            self.__changed()
+    def record_reload(self, name: str, success: bool, duration: float):
+
+        with self.__lock:
+            entry = self.__packs.get(name)
+            if entry is None:
+                return
+            entry.update(
+                status="loaded" if success else "failed",
+                last_reload=time.time(),
+                last_duration=duration,
+                reloads=entry["reloads"] + 1,
+            )
+            self.__changed()
+    def snapshot(self) -> tuple[str, list[str], dict]:
+        """(ETag, 含 __init__.py 的节点包列表, 全部条目的元数据)"""
+        with self.__lock:
+            etag = f'"{self.__epoch}-{self.__version}"'
+            modules = sorted(name for name, entry in self.__packs.items() if entry["package"])
+            packs = {name: dict(entry) for name, entry in self.__packs.items()}
+        return etag, modules, packs
+PACK_INVENTORY = NodePackInventory()
+class WebAssetCache:
+    """
+    /extensions/{module}/{path} 的路径解析缓存
+
+    缓存条目记录解析时使用的 web 目录，EXTENSION_WEB_DIRS 中的目录变化（节点包重载）后自动失效；
+    文件删除事件会移除对应条目。
+    """
+    def __init__(self):
+
+        self.__lock: threading.Lock = threading.Lock()
+        # (模块名, 请求路径) -> (web 目录, 文件完整路径)
+        self.__entries: dict[tuple[str, str], tuple[str, str]] = {}
+    @staticmethod
+    def __join(base_dir: str, relative_path: str) -> str:
+        """拼接并确认结果仍在 base_dir 内，防止 ../ 越界"""
+        base_dir = os.path.abspath(base_dir)
+        full_path = os.path.abspath(os.path.join(base_dir, relative_path))
+        if os.path.commonpath([base_dir, full_path]) != base_dir or not os.path.isfile(full_path):
+            return None
+        return full_path
+    def resolve(self, module_name: str, relative_path: str) -> str:
+
+        key = (module_name, relative_path)
+        web_dir = nodes.EXTENSION_WEB_DIRS.get(module_name)
+        entry = self.__entries.get(key)
+        if entry is not None and entry[0] == web_dir:
+            return entry[1]
+        full_path = None
+        if web_dir is not None:
+            full_path = self.__join(web_dir, relative_path)
+        web_root = getattr(PromptServer.instance, 'web_root', None)
+        if full_path is None and web_root:
+            full_path = self.__join(os.path.join(web_root, "extensions", module_name), relative_path)
+        if full_path is not None:
+            with self.__lock:
+                self.__entries[key] = (web_dir, full_path)
+        return full_path
+    def forget(self, full_path: str):
+        """full_path 需经过 normalize_path"""
+        with self.__lock:
+            for key in [k for k, v in self.__entries.items() if normalize_path(v[1]) == full_path]:
+                del self.__entries[key]
+    @staticmethod
+    def locate(file_path: str) -> tuple[str, str]:
+        """文件属于哪个节点包的 WEB_DIRECTORY，返回 (模块名, 以 / 分隔的相对路径)，不属于时返回 None"""
+        if not file_path.endswith(HOTRELOAD_WEB_EXTENSIONS):
+            return None
+        file_path = normalize_path(file_path)
+        for module_name, web_dir in list(nodes.EXTENSION_WEB_DIRS.items()):
+            web_dir = os.path.join(normalize_path(web_dir), '')
+            if file_path.startswith(web_dir):
+                return module_name, file_path[len(web_dir):].replace(os.path.sep, '/')
+        return None
+WEB_ASSETS = WebAssetCache()
+class ReloadJournal:
+    """
+    追加写入的重载日志（JSON Lines，与 config.json 同目录）
+
+    记录类型:
+        {"f": 路径, "m": mtime_ns, "s": size, "h": 指纹}   文件指纹
+        {"x": 路径}                                       文件已删除
+        {"r": 节点包, "t": 时间, "ok": 是否成功, "d": 耗时, ...}   重载结果
+    启动时回放日志预热指纹缓存；记录数明显多于有效条目时整体重写（压缩）。
+    """
+    HISTORY_LIMIT: int = 500
+    FLUSH_INTERVAL: float = 1.0
+
+    def __init__(self, path: str):
+
+        self.__path: str = path
+        self.__lock: threading.Lock = threading.Lock()
+        self.__pending: list[str] = []
+        self.__history: deque = deque(maxlen=self.HISTORY_LIMIT)
+        self.__lines: int = 0
+        self.__wake: threading.Event = threading.Event()
+        self.__thread: threading.Thread = None
+    @staticmethod
+    def __dumps(record: dict) -> str:
+
+        return json.dumps(record, separators=(',', ':'), ensure_ascii=False)
+    def load(self) -> dict[str, tuple[int, int, str]]:
+        """回放日志，返回 路径 -> (mtime_ns, size, 指纹)"""
+        entries = {}
+        try:
+            with open(self.__path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    self.__lines += 1
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # 上次退出时写了一半的行
+                        continue
+                    if "f" in record:
+                        entries[record["f"]] = (record["m"], record["s"], record["h"])
+                    elif "x" in record:
+                        entries.pop(record["x"], None)
+                    elif "r" in record:
+                        self.__history.append(record)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"\033[91m[LG_HotReload] Error loading reload journal: {str(e)}\033[0m")
+        return entries
+    def start(self):
+
+        if self.__thread is None:
+            self.__thread = threading.Thread(target=self.__run, name="HotReload.Journal", daemon=True)
+            self.__thread.start()
+    def record_fingerprint(self, file_path: str, entry: tuple[int, int, str]):
+
+        if entry is None:
+            record = {"x": file_path}
+        else:
+            record = {"f": file_path, "m": entry[0], "s": entry[1], "h": entry[2]}
+        with self.__lock:
+            self.__pending.append(self.__dumps(record))
+    def record_reload(self, module_name: str, success: bool, duration: float, **details):
+
+        record = {"r": module_name, "t": time.time(), "ok": success, "d": round(duration, 4), **details}
+        with self.__lock:
+            self.__history.append(record)
+            self.__pending.append(self.__dumps(record))
+        self.__wake.set()
+    def last_reload(self, module_name: str) -> dict:
+
+        with self.__lock:
+            for record in reversed(self.__history):
+                if record["r"] == module_name:
+                    return record
+        return None
+    def history(self, module_name: str = None, limit: int = 100) -> list[dict]:
+        """最近的重载记录，最新的在前"""
+        with self.__lock:
+            records = [x for x in reversed(self.__history) if module_name is None or x["r"] == module_name]
+        return [
+            {"module": x["r"], "timestamp": x["t"], "success": x["ok"], "duration": x["d"],
+             **{k: v for k, v in x.items() if k not in ("r", "t", "ok", "d")}}
+            for x in records[:limit]
+        ]
+    def flush(self):
+
+        with self.__lock:
+            lines, self.__pending = self.__pending, []
+        if not lines:
+            return
+        try:
+            with open(self.__path, 'a', encoding='utf-8') as f:
+                f.write('\n'.join(lines) + '\n')
+            self.__lines += len(lines)
+        except Exception as e:
+            print(f"\033[91m[LG_HotReload] Error writing reload journal: {str(e)}\033[0m")
+            return
+        entries = FILE_FINGERPRINTS.entries()
+        if self.__lines > 2 * (len(entries) + len(self.__history)) + 1000:
+            self.compact(entries)
+    def compact(self, entries: dict[str, tuple[int, int, str]] = None):
+        """用当前指纹缓存与重载历史重写日志"""
+        entries = FILE_FINGERPRINTS.entries() if entries is None else entries
+        with self.__lock:
+            history = list(self.__history)
+            # 重写期间产生的新记录留到下次追加
+            lines = [self.__dumps({"f": k, "m": v[0], "s": v[1], "h": v[2]}) for k, v in entries.items()]
+            lines.extend(self.__dumps(x) for x in history)
+        temp_path = self.__path + ".tmp"
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                f.write('\n'.join(lines) + ('\n' if lines else ''))
+            os.replace(temp_path, self.__path)
+            self.__lines = len(lines)
+        except Exception as e:
+            print(f"\033[91m[LG_HotReload] Error compacting reload journal: {str(e)}\033[0m")
+    def __run(self):
+
+        while True:
+            self.__wake.wait(self.FLUSH_INTERVAL)
+            self.__wake.clear()
+            self.flush()
+RELOAD_JOURNAL = ReloadJournal(JOURNAL_PATH)
+# 常驻编译子进程：每行读入一个 {"file": 路径}，输出一行编译结果
+PREFLIGHT_COMPILE_SOURCE = r"""
+import sys, json
+for line in sys.stdin:
+    path = json.loads(line)["file"]
+    try:
+        with open(path, "rb") as f:
+            compile(f.read(), path, "exec", dont_inherit=True)
+        result = {"ok": True}
+    except SyntaxError as e:
+        result = {"ok": False, "error": {"type": type(e).__name__, "message": e.msg, "file": e.filename or path,
+                                         "line": e.lineno, "offset": e.offset, "text": (e.text or "").rstrip()}}
+    except ValueError as e:
+        result = {"ok": False, "error": {"type": type(e).__name__, "message": str(e), "file": path}}
+    except OSError:
+        # 文件在编辑器保存过程中暂时不可读，交给正式重载处理
+        result = {"ok": True}
+    sys.stdout.write(json.dumps(result) + "\n")
+    sys.stdout.flush()
+"""
+# 一次性试导入子进程：只报告 SyntaxError/ImportError，缺少服务器上下文导致的其他异常忽略
+PREFLIGHT_IMPORT_SOURCE = r"""
+import sys, json, os, importlib.util, traceback
+module_path, base_path, custom_nodes_root = sys.argv[1:4]
+sys.path[:0] = [base_path, custom_nodes_root]
+name = module_path.replace(".", "_x_")
+result = {"ok": True}
+try:
+    if os.path.isfile(module_path):
+        spec = importlib.util.spec_from_file_location(name, module_path)
+    else:
+        spec = importlib.util.spec_from_file_location(
+            name, os.path.join(module_path, "__init__.py"), submodule_search_locations=[module_path])
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+except SyntaxError as e:
+    result = {"ok": False, "error": {"type": type(e).__name__, "message": e.msg, "file": e.filename,
+                                     "line": e.lineno, "offset": e.offset, "text": (e.text or "").rstrip()}}
+except ImportError as e:
+    frames = [x for x in traceback.extract_tb(e.__traceback__) if x.filename.startswith(module_path)]
+    result = {"ok": False, "error": {"type": type(e).__name__, "message": str(e),
+                                     "file": frames[-1].filename if frames else None,
+                                     "line": frames[-1].lineno if frames else None}}
+except BaseException:
+    pass
+sys.stdout.write("\nHOTRELOAD_PREFLIGHT " + json.dumps(result) + "\n")
+"""
+class PreflightChecker:
+    """
+    重载前的预检，全部在子进程中完成，不触碰正在运行的版本
+
+    - 编译：常驻的编译子进程池，变更的多个文件并行编译（compile 持有 GIL，子进程才能用满多核）
+    - 试导入（可选）：每次启动一个新的子进程导入整个节点包，只报告 SyntaxError/ImportError
+    """
+    def __init__(self, workers: int = HOTRELOAD_PREFLIGHT_WORKERS):
+
+        self.__size: int = workers
+        self.__idle: queue.Queue = queue.Queue()
+        self.__spawned: int = 0
+        self.__lock: threading.Lock = threading.Lock()
+        self.__executor: ThreadPoolExecutor = ThreadPoolExecutor(workers, thread_name_prefix="HotReload.Preflight")
+    def __acquire(self) -> subprocess.Popen:
+
+        try:
+            return self.__idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self.__lock:
+            spawn = self.__spawned < self.__size
+            if spawn:
+                self.__spawned += 1
+        if not spawn:
+            return self.__idle.get()
+        try:
+            return subprocess.Popen(
+                [sys.executable, "-I", "-c", PREFLIGHT_COMPILE_SOURCE],
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                text=True, encoding="utf-8", bufsize=1
+            )
+        except Exception:
+            with self.__lock:
+                self.__spawned -= 1
+            raise
+    def __discard(self, process: subprocess.Popen):
+
+        with self.__lock:
+            self.__spawned -= 1
+        try:
+            process.kill()
+        except Exception:
+            pass
+    def compile_file(self, file_path: str) -> dict:
+        """返回错误信息，编译通过（或无法判断）时返回 None"""
+        try:
+            process = self.__acquire()
+        except Exception as e:
+            logging.warning(f"[LG_HotReload] Preflight worker unavailable: {e}")
+            return None
+        try:
+            process.stdin.write(json.dumps({"file": file_path}) + "\n")
+            process.stdin.flush()
+            line = process.stdout.readline()
+            if not line:
+                raise RuntimeError("preflight worker exited")
+            result = json.loads(line)
+        except Exception as e:
+            logging.warning(f"[LG_HotReload] Preflight compile of {file_path} skipped: {e}")
+            self.__discard(process)
+            return None
+        self.__idle.put(process)
+        return None if result.get("ok") else dict(result["error"], stage="compile")
+    def trial_import(self, module_path: str) -> dict:
+
+        try:
+            completed = subprocess.run(
+                [sys.executable, "-c", PREFLIGHT_IMPORT_SOURCE, module_path,
+                 getattr(folder_paths, 'base_path', os.getcwd()), CUSTOM_NODE_ROOT[0]],
+                stdin=subprocess.DEVNULL, capture_output=True, text=True, encoding="utf-8", errors="replace",
+                timeout=HOTRELOAD_PREFLIGHT_TIMEOUT
+            )
+        except subprocess.TimeoutExpired:
+            print(f'\033[93m[LG_HotReload] 试导入超时，跳过: {module_path}\033[0m')
+            return None
+        except Exception as e:
+            logging.warning(f"[LG_HotReload] Preflight import of {module_path} skipped: {e}")
+            return None
+        for line in reversed(completed.stdout.splitlines()):
+            if line.startswith("HOTRELOAD_PREFLIGHT "):
+                result = json.loads(line[len("HOTRELOAD_PREFLIGHT "):])
+                return None if result.get("ok") else dict(result["error"], stage="import")
+        return None
+    def check(self, module_name: str, changed_files: set[str]) -> list[dict]:
+        """并行编译变更的 .py 文件，编译全部通过且开启试导入时再试导入节点包"""
+        files = sorted(x for x in changed_files if x.endswith('.py') and os.path.isfile(x))
+        errors = [x for x in self.__executor.map(self.compile_file, files) if x is not None]
+        if not errors and HOTRELOAD_PREFLIGHT_IMPORT:
+            error = self.trial_import(os.path.join(CUSTOM_NODE_ROOT[0], module_name))
+            if error is not None:
+                errors.append(error)
+        return errors
+    def close(self):
+
+        while True:
+            try:
+                process = self.__idle.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                process.stdin.close()
+                process.wait(timeout=1)
+            except Exception:
+                process.kill()
+PREFLIGHT = PreflightChecker()
+def iter_module_files(module_path: str, extensions: tuple[str, ...] = None):
+    """遍历节点包内需要监听的文件，跳过被裁剪的目录"""
+    for dir_path, dir_names, file_names in os.walk(module_path):
+        dir_names[:] = [d for d in dir_names if not is_pruned_dir(d)]
+        for file_name in file_names:
+            if file_name.endswith(extensions) if extensions else is_watched_extension(file_name):
+                yield os.path.join(dir_path, file_name)
+def prime_fingerprints(module_names: list[str]):
+    """预先计算节点包文件指纹，使首次保存也能判断内容是否真正变化"""
+    for module_name in module_names:
+        module_path = os.path.join(CUSTOM_NODE_ROOT[0], module_name)
+        seen = set()
+        for file_path in iter_module_files(module_path):
+            FILE_FINGERPRINTS.fingerprint(file_path)
+            seen.add(file_path)
+        FILE_FINGERPRINTS.forget_missing(os.path.join(module_path, ''), seen)
+        PACK_INVENTORY.update(module_name, files=len(seen))
+def collect_changed_since(since: float) -> dict[str, set[str]]:
+    """被监听的节点包中 since 之后修改过的 .py 文件，{节点包: 变更文件}"""
+    root = CUSTOM_NODE_ROOT[0]
+    changed = {}
+    for module_name in sorted(os.listdir(root)):
+        if not is_module_observed(module_name):
+            continue
+        module_path = os.path.join(root, module_name)
+        if os.path.isdir(module_path):
+            candidates = iter_module_files(module_path, ('.py',))
+        else:
+            candidates = [module_path] if module_name.endswith('.py') else []
+        files = set()
+        for file_path in candidates:
+            try:
+                if os.stat(file_path).st_mtime > since:
+                    files.add(file_path)
+            except OSError:
+                continue
+        if files:
+            changed[module_name] = files
+    return changed
+def normalize_path(file_path: str) -> str:
+
+    return os.path.normcase(os.path.abspath(file_path))
+# 重载日志写在本插件目录中，它的变更不能触发重载（HOTRELOAD_EXTENSIONS=* 时会无限循环）
+IGNORED_FILES: set[str] = {normalize_path(JOURNAL_PATH), normalize_path(JOURNAL_PATH + ".tmp")}
+class ModuleDependencyGraph:
+    """
+    节点包内部的导入依赖图（以文件路径为节点）
+
+    每个文件的导入解析结果按 (mtime_ns, size) 缓存，文件未变化时不重新解析。
+    这里不能使用 FILE_FINGERPRINTS：它决定文件事件是否触发重载，提前写入尚未处理的事件对应的新内容，
+    会导致这些事件被当作"内容未变化"而丢弃。
+    """
+    def __init__(self):
+
+        self.__imports: dict[str, tuple[tuple[int, int], frozenset[str]]] = {}
+        self.__lock: threading.Lock = threading.Lock()
+    @staticmethod
+    def __resolve(base_dir: str, dotted: str) -> list[str]:
+        """把 base_dir 下的点分模块名解析为文件，包含沿途包的 __init__.py"""
+        files = []
+        path = base_dir
+        for part in dotted.split('.') if dotted else []:
+            path = os.path.join(path, part)
+            init_file = os.path.join(path, '__init__.py')
+            if os.path.isfile(init_file):
+                files.append(init_file)
+            elif os.path.isfile(path + '.py'):
+                files.append(path + '.py')
+                break
+            else:
+                break
+        return files
+    def __parse(self, file_path: str, module_root: str) -> frozenset[str]:
+
+        try:
+            with open(file_path, 'rb') as f:
+                tree = ast.parse(f.read(), filename=file_path)
+        except (OSError, SyntaxError, ValueError):
+            return frozenset()
+        root_name = os.path.basename(module_root)
+        imported = []
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                for alias in node.names:
+                    # 通过 sys.path 注入或以包目录名开头的绝对导入
+                    first, _, rest = alias.name.partition('.')
+                    if first == root_name:
+                        imported += self.__resolve(module_root, rest)
+                    else:
+                        imported += self.__resolve(module_root, alias.name)
+            elif isinstance(node, ast.ImportFrom):
+                if node.level:
+                    base_dir = os.path.dirname(file_path)
+                    for _ in range(node.level - 1):
+                        base_dir = os.path.dirname(base_dir)
+                    dotted = node.module or ''
+                else:
+                    first, _, rest = (node.module or '').partition('.')
+                    base_dir, dotted = (module_root, rest) if first == root_name else (module_root, node.module)
+                imported += self.__resolve(base_dir, dotted)
+                # from .pkg import submodule
+                package_dir = os.path.join(base_dir, *dotted.split('.')) if dotted else base_dir
+                for alias in node.names:
+                    if alias.name != '*':
+                        imported += self.__resolve(package_dir, alias.name)[-1:]
+        return frozenset(normalize_path(x) for x in imported if normalize_path(x).startswith(module_root))
+    def imports_of(self, file_path: str, module_root: str) -> frozenset[str]:
+
+        try:
+            stat = os.stat(file_path)
+            version = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            version = None
+        cached = self.__imports.get(file_path)
+        if cached and version is not None and cached[0] == version:
+            return cached[1]
+        imported = self.__parse(file_path, module_root)
+        with self.__lock:
+            self.__imports[file_path] = (version, imported)
+        return imported
+    def affected_files(self, module_path: str, changed_files: set[str]) -> set[str]:
+        """
+        计算变更文件及其全部反向依赖
+
+        非入口包的 __init__.py 被重新执行时，其子模块也一并失效，
+        否则新的包对象上缺少已缓存子模块的属性。
+        """
+        module_root = normalize_path(module_path)
+        all_files = [normalize_path(x) for x in iter_module_files(module_path, ('.py',))]
+        reverse: defaultdict[str, set[str]] = defaultdict(set)
+        for file_path in all_files:
+            for imported in self.imports_of(file_path, module_root):
+                reverse[imported].add(file_path)
+        affected = set()
+        pending = [normalize_path(x) for x in changed_files]
+        while pending:
+            file_path = pending.pop()
+            if file_path in affected:
+                continue
+            affected.add(file_path)
+            pending.extend(reverse.get(file_path, ()))
+            if os.path.basename(file_path) == '__init__.py' and os.path.dirname(file_path) != module_root:
+                package_dir = os.path.dirname(file_path) + os.path.sep
+                pending.extend(x for x in all_files if x.startswith(package_dir))
+        return affected
+MODULE_DEPENDENCIES = ModuleDependencyGraph()
+def run_on_server_loop(func, *args):
+    """
+    在服务器事件循环线程上同步执行 func 并返回结果
+
+    func 中没有 await，执行期间事件循环不会穿插处理其他请求，因此其中的修改对请求处理是原子的。
+    事件循环未运行或当前已在事件循环线程上时直接执行。
+    """
+    loop = getattr(PromptServer.instance, 'loop', None)
+    if loop is None or not loop.is_running():
+        return func(*args)
+    try:
+        if asyncio.get_running_loop() is loop:
+            return func(*args)
+    except RuntimeError:
+        pass
+    async def call():
+        return func(*args)
+    return asyncio.run_coroutine_threadsafe(call(), loop).result()
+class ShadowNodeRegistries:
+    """
+    load_custom_node 的影子注册表
+
+    新版本在 load_custom_node 的一个副本中加载，副本的全局变量中注册表换成了拷贝，
+    nodes 模块本身不被修改：暂存期间执行线程与 /object_info 看到的始终是完整的旧注册表。
+    校验通过后再由切换阶段写入真实的注册表；加载失败时真实注册表保持不变。
+    """
+    REGISTRIES = ('NODE_CLASS_MAPPINGS', 'NODE_DISPLAY_NAME_MAPPINGS', 'EXTENSION_WEB_DIRS')
+    __MISSING = object()
+
+    def __init__(self):
+        self.__real: dict[str, dict] = {}
+        self.__shadow: dict[str, dict] = {}
+        # 注册表名 -> 新增或变化的条目
+        self.staged: dict[str, dict] = {name: {} for name in self.REGISTRIES}
+    def __enter__(self):
+        for name in self.REGISTRIES:
+            real = getattr(nodes, name)
+            self.__real[name] = real
+            self.__shadow[name] = dict(real)
+        return self
+    def bind(self, function):
+        """返回 function 的副本，其模块全局变量中的注册表指向影子拷贝（需在 with 块内调用）"""
+        function_globals = dict(function.__globals__)
+        function_globals.update(self.__shadow)
+        staged_function = types.FunctionType(
+            function.__code__, function_globals, function.__name__, function.__defaults__, function.__closure__
+        )
+        staged_function.__kwdefaults__ = function.__kwdefaults__
+        staged_function.__qualname__ = function.__qualname__
+        return staged_function
+    def __exit__(self, *exc_info):
+        for name, real in self.__real.items():
+            self.staged[name] = {
+                key: value for key, value in self.__shadow[name].items()
+                if real.get(key, self.__MISSING) != value
+            }
+        self.__real.clear()
+        self.__shadow.clear()
+        return False
+def validate_staged_reload(module, node_classes: dict, new_routes: list) -> list[str]:
+    """
+    检查新版本能否安全切换，返回错误列表（空列表表示通过）
+    """
+    errors = []
+    if module is None:
+        errors.append('未找到加载后的模块')
+    for name, node_cls in node_classes.items():
+        try:
+            if not isinstance(node_cls.INPUT_TYPES(), dict):
+                errors.append(f'{name}: INPUT_TYPES() 未返回 dict')
+        except Exception as e:
+            errors.append(f'{name}: INPUT_TYPES() 调用失败: {e}')
+        function = getattr(node_cls, 'FUNCTION', None)
+        if function is not None and not callable(getattr(node_cls, function, None)):
+            errors.append(f'{name}: FUNCTION 指向的方法 {function} 不存在')
+    for route in new_routes:
+        if not hasattr(route, 'handler'):
+            continue
+        if not callable(route.handler) or not str(getattr(route, 'path', '')).startswith('/'):
+            errors.append(f'无效的路由: {getattr(route, "method", "?")} {getattr(route, "path", "?")}')
+    return errors
 def is_hidden_file_windows(file_path: str) -> bool:
 
     try:
@@ -224,214 +1790,528 @@ def is_hidden_file(file_path: str) -> bool:
                 return True
             file_path = os.path.dirname(file_path)
     return False
-def dfs(item_list: list, searches: set) -> bool:
+def is_link(value) -> bool:
 
-    for item in item_list:
-        if isinstance(item, (frozenset, tuple)) and dfs(item, searches):
-            return True
-        elif item in searches:
-            return True
-    return False
-class DebouncedHotReloader(FileSystemEventHandler):
-    
-    def __init__(self, delay: float = 1.0):
+    return isinstance(value, list) and len(value) == 2 and isinstance(value[0], str) and isinstance(value[1], int)
+def upstream_class_types(dynprompt, node_ids) -> dict[str, frozenset[str]]:
+    """
+    基于 dynprompt 的依赖 DAG，计算每个节点自身及其全部上游节点的类型集合
 
-        super().__init__()
-        self.__delay: float = delay
-        self.__last_modified: defaultdict[str, float] = defaultdict(float)
-        self.__reload_timers: dict[str, threading.Timer] = {}
-        self.__hashes: dict[str, str] = {}
-        self.__lock: threading.Lock = threading.Lock()
-        # 添加最后成功重载时间记录
-        self.__last_successful_reload: defaultdict[float] = defaultdict(float)
-        self.__successful_reload_cooldown = 5.0  # 成功重载后的冷却时间（秒）
-    def __reload(self, module_name: str) -> web.Response:
-        with self.__lock:
+    某节点被重载时，只有自身和以它为上游的（下游消费者）节点的输出需要失效。
+    """
+    memo: dict[str, frozenset[str]] = {}
+    for root_id in node_ids:
+        stack = [(root_id, False)]
+        while stack:
+            node_id, expanded = stack.pop()
+            if node_id in memo:
+                continue
             try:
-                print(f'\n\033[94m[LG_HotReload] 开始重载模块: {module_name}\033[0m')
-
-                # 计算 sys_module_name（与 load_custom_node 中的逻辑一致）
-                # load_custom_node 会将路径中的 "." 替换为 "_x_"
-                module_path_for_sys = os.path.join(CUSTOM_NODE_ROOT[0], module_name)
-                sys_module_name = module_path_for_sys.replace(".", "_x_")
-                original_routes_count = len(PromptServer.instance.routes)
-                
-                # 收集需要保留的路由
-                routes_to_keep = []
-                routes_removed_count = 0
-                
-                for route in PromptServer.instance.routes:
-                    should_remove = False
-                    if hasattr(route, 'handler') and hasattr(route.handler, '__module__'):
-                        handler_module = route.handler.__module__
-                        # 使用统一的匹配函数
-                        if is_module_match(handler_module, module_name, sys_module_name):
-                            should_remove = True
-                            routes_removed_count += 1
-                            route_key = f"{route.method}:{route.path}"
-
-
-                    if not should_remove:
-                        routes_to_keep.append(route)
-                
-                # 重建路由表
-                if routes_removed_count > 0:
-                    # 由于RouteTableDef不支持直接删除路由，我们采用替换策略
-                    # 直接使用_items清理路由
-                    try:
-                        PromptServer.instance.routes._items.clear()
-                        PromptServer.instance.routes._items.extend(routes_to_keep)
-                    except Exception as e:
-                        print(f'\033[91m[LG_HotReload] 路由清理失败: {str(e)}\033[0m')
-                        traceback.print_exc()
-                else:
-                    print(f'\033[96m[LG_HotReload] 未发现需要清理的路由\033[0m')
-
-                module_path = os.path.join(CUSTOM_NODE_ROOT[0], module_name)
-
-                # 收集需要重新加载的所有模块
-                modules_to_reload = set()
-                for name, module in list(sys.modules.items()):
-                    if hasattr(module, '__file__') and module.__file__ and \
-                       module.__file__.startswith(module_path):
-                        modules_to_reload.add(name)
-
-                # 删除所有相关模块
-                for name in modules_to_reload:
-                    if name in sys.modules:
-                        del sys.modules[name]
+                node = dynprompt.get_node(node_id)
+            except Exception:
+                memo[node_id] = frozenset()
+                continue
+            inputs = [value[0] for value in node.get("inputs", {}).values() if is_link(value)]
+            if not expanded:
+                stack.append((node_id, True))
+                stack.extend((x, False) for x in inputs if x not in memo)
+                continue
+            classes = {node.get("class_type")}
+            for input_id in inputs:
+                classes.update(memo.get(input_id, ()))
+            memo[node_id] = frozenset(classes)
+    return memo
+NODE_INFO_FUNCTION = None
+def get_node_info_function():
+    """从 ComfyUI 的 /object_info/{node_class} 路由处理函数的闭包中取出 node_info"""
+    global NODE_INFO_FUNCTION
+    if NODE_INFO_FUNCTION is None:
+        for route in list(PromptServer.instance.routes):
+            if getattr(route, 'path', None) != '/object_info/{node_class}':
+                continue
+            code = getattr(route.handler, '__code__', None)
+            if code is not None and 'node_info' in code.co_freevars:
+                NODE_INFO_FUNCTION = route.handler.__closure__[code.co_freevars.index('node_info')].cell_contents
+                break
+    return NODE_INFO_FUNCTION
+def collect_node_definitions(class_types) -> dict:
+    """批量生成节点类型的 object_info，无法获取 node_info 时返回空字典（前端回退为逐个请求）"""
+    node_info = get_node_info_function()
+    if node_info is None:
+        return {}
+    definitions = {}
+    with folder_paths.cache_helper if hasattr(folder_paths, 'cache_helper') else contextlib.nullcontext():
+        for class_type in class_types:
+            if class_type not in nodes.NODE_CLASS_MAPPINGS:
+                continue
+            try:
+                definitions[class_type] = node_info(class_type)
+            except Exception as e:
+                logging.warning(f"[LG_HotReload] Failed to build object_info for {class_type}: {e}")
+    return definitions
+# 节点类型 -> object_info 的指纹，用于判断重载后节点接口是否变化
+NODE_DEFINITION_FINGERPRINTS: dict[str, str] = {}
+def definition_fingerprint(definition: dict) -> str:
+
+    return hashlib.blake2b(json.dumps(definition, sort_keys=True, default=str).encode(), digest_size=16).hexdigest()
+def fingerprint_node_definitions(class_types) -> dict[str, str]:
+    """返回节点类型的接口指纹（INPUT_TYPES/RETURN_TYPES/显示名称等），尚未记录的先计算"""
+    missing = [x for x in class_types if x not in NODE_DEFINITION_FINGERPRINTS]
+    for class_type, definition in collect_node_definitions(missing).items():
+        NODE_DEFINITION_FINGERPRINTS[class_type] = definition_fingerprint(definition)
+    return {x: NODE_DEFINITION_FINGERPRINTS.get(x) for x in class_types}
+# 最近一次缓存失效的统计
+CACHE_INVALIDATION_STATS: dict = {"invalidated": 0, "preserved": 0, "total_invalidated": 0, "total_preserved": 0}
+def invalidate_reloaded_entries(cache, dynprompt) -> int:
+    """
+    在 set_prompt 计算出本次的缓存键之后，删除受已重载节点类型影响的条目
 
-                # 重新加载自定义节点
-                # 追踪load_custom_node前的路由数量
-                routes_before_load = len(PromptServer.instance.routes)
+    每个缓存维护 节点类型 -> 缓存键 的反向索引：缓存键首次出现时，
+    用依赖 DAG 记录该节点自身与全部上游的类型。失效时只删除重载节点及其
+    下游消费者的条目，上游节点的输出保持缓存。返回删除的条目数。
+    """
+    key_set = getattr(cache, 'cache_key_set', None)
+    if key_set is None:
+        return 0
+    if not hasattr(cache, '_hotreload_class_index'):
+        cache._hotreload_class_index = defaultdict(set)
+        cache._hotreload_indexed = set()
+    class_index = cache._hotreload_class_index
+    indexed = cache._hotreload_indexed
+    new_ids = [node_id for node_id, data_key in key_set.keys.items() if data_key is not None and data_key not in indexed]
+    if new_ids:
+        upstream = upstream_class_types(dynprompt, new_ids)
+        for node_id in new_ids:
+            data_key = key_set.get_data_key(node_id)
+            indexed.add(data_key)
+            entry = (data_key, key_set.get_subcache_key(node_id))
+            for class_type in upstream.get(node_id, ()):
+                class_index[class_type].add(entry)
+        # 清理已被缓存淘汰的键，避免索引无限增长
+        if len(indexed) > 2 * len(cache.cache) + 1024:
+            live = set(cache.cache.keys())
+            indexed.intersection_update(live)
+            for class_type in list(class_index.keys()):
+                class_index[class_type] = {x for x in class_index[class_type] if x[0] in live}
+
+    seen_generation = getattr(cache, '_hotreload_generation', 0)
+    if seen_generation >= RELOAD_GENERATION:
+        return 0
+    # 代数与节点类型一起在锁内读取，不会出现代数已推进而类型尚未写入的中间状态
+    with RELOAD_GENERATION_LOCK:
+        cache._hotreload_generation = RELOAD_GENERATION
+        pending = [class_type for class_type, generation in RELOADED_CLASS_TYPES.items() if generation > seen_generation]
+    started = time.perf_counter()
+    removed = 0
+    for class_type in pending:
+        for data_key, subcache_key in class_index.pop(class_type, ()):
+            indexed.discard(data_key)
+            if cache.cache.pop(data_key, None) is not None:
+                removed += 1
+            if subcache_key is not None and hasattr(cache, 'subcaches'):
+                cache.subcaches.pop(subcache_key, None)
+    RELOAD_STATS.observe("cache_invalidation", time.perf_counter() - started)
+    if removed:
+        preserved = sum(1 for data_key in key_set.keys.values() if data_key in cache.cache)
+        CACHE_INVALIDATION_STATS.update(invalidated=removed, preserved=preserved)
+        CACHE_INVALIDATION_STATS["total_invalidated"] += removed
+        CACHE_INVALIDATION_STATS["total_preserved"] += preserved
+        print(f'\033[96m[LG_HotReload] 缓存失效: 移除 {removed} 个受影响的输出，保留 {preserved} 个上游/无关节点的输出\033[0m')
+    return removed
+class ReloadQueue:
+    """
+    模块重载队列：一个调度线程 + 按到期时间排序的优先队列
 
-                try:
-                    # 使用 asyncio.run 来同步调用异步函数
-                    success = asyncio.run(load_custom_node(module_path))
-                except Exception as e:
-                    print(f'\033[91m[LG_HotReload] 调用 load_custom_node 失败: {str(e)}\033[0m')
-                    success = False
-                
-                # 追踪load_custom_node后的路由数量
-                routes_after_load = len(PromptServer.instance.routes)
-
-                if not success:
-                    print(f'\033[91m[LG_HotReload] 加载模块失败: {module_name}\033[0m')
-                    return web.Response(text='FAILED')
-
-                # 关键步骤：同步新路由到 aiohttp 的 router
-                # 通过直接替换 handler 来实现热重载
-                try:
-                    # 获取新添加的路由
-                    new_routes_count = routes_after_load - routes_before_load
-                    if new_routes_count > 0 and hasattr(PromptServer.instance, 'app') and PromptServer.instance.app:
-                        new_routes = list(PromptServer.instance.routes)[-new_routes_count:]
-                        router = PromptServer.instance.app.router
-
-                        for route in new_routes:
-                            if hasattr(route, 'method') and hasattr(route, 'path') and hasattr(route, 'handler'):
-                                if hasattr(route.handler, '__module__'):
-                                    handler_module = route.handler.__module__
-                                    if is_module_match(handler_module, module_name, sys_module_name):
-                                        handler_id = id(route.handler)
-
-                                        # 查找并替换旧的 handler
-                                        for resource in list(router._resources):
-                                            resource_path = getattr(resource, '_path', None) or getattr(resource, 'canonical', None)
-
-                                            # 匹配路径（包括 /api 前缀的版本）
-                                            if resource_path and (resource_path == route.path or resource_path == f"/api{route.path}"):
-                                                for route_obj in resource:
-                                                    if hasattr(route_obj, 'handler') and hasattr(route_obj.handler, '__module__'):
-                                                        route_handler_module = route_obj.handler.__module__
-                                                        if is_module_match(route_handler_module, module_name, sys_module_name):
-                                                            # 直接替换 handler（保留路由缓存结构）
-                                                            if hasattr(route_obj, '_handler'):
-                                                                old_id = id(route_obj._handler)
-                                                                route_obj._handler = route.handler
+    - 防抖窗口内同一模块的事件合并为一次重载，每个新事件把到期时间往后推
+    - 模块正在重载时到来的事件不会丢弃，而是在当前重载结束后再执行一次
+    - 最多 max_parallel 个节点包同时处理
+    """
+    def __init__(self, run, delay: float = 1.0, max_parallel: int = HOTRELOAD_MAX_PARALLEL):
 
+        # run(module_name, changed_files, file_path, action)
+        self.__run = run
+        self.__delay: float = delay
+        self.__max_parallel: int = max_parallel
+        self.__condition: threading.Condition = threading.Condition()
+        # (到期时间, 序号, 模块名)，被推迟的旧条目在出队时跳过
+        self.__heap: list[tuple[float, int, str]] = []
+        self.__sequence: int = 0
+        self.__due: dict[str, float] = {}
+        # 模块名 -> 等待中的任务（变更文件、最后事件、首个事件时间）
+        self.__jobs: dict[str, dict] = {}
+        self.__running: set[str] = set()
+        self.__executor: ThreadPoolExecutor = ThreadPoolExecutor(max_parallel, thread_name_prefix="HotReload.Reload")
+        self.__thread: threading.Thread = None
+        # 统计
+        self.__submitted: int = 0
+        self.__coalesced: int = 0
+        self.__deferred: int = 0
+        self.__completed: int = 0
+        self.__max_depth: int = 0
+        self.__latency_total: float = 0.0
+        self.__latency_max: float = 0.0
+        self.__last_latency: float = 0.0
+    def start(self):
 
-                except Exception as e:
-                    print(f'\033[91m[LG_HotReload] 路由同步失败: {str(e)}\033[0m')
-                    traceback.print_exc()
+        with self.__condition:
+            if self.__thread is not None and self.__thread.is_alive():
+                return
+            self.__thread = threading.Thread(target=self.__schedule_loop, name="HotReload.Scheduler", daemon=True)
+            self.__thread.start()
+    def submit(self, module_name: str, file_path: str, action: str = "modified"):
+
+        now = time.monotonic()
+        with self.__condition:
+            self.__submitted += 1
+            job = self.__jobs.get(module_name)
+            if job is None:
+                job = self.__jobs[module_name] = {"files": set(), "first_event": now}
+            else:
+                self.__coalesced += 1
+            job["files"].add(file_path)
+            job["file"] = file_path
+            job["action"] = action
+            job["last_event"] = now
+            self.__max_depth = max(self.__max_depth, len(self.__jobs))
+            if module_name in self.__running:
+                # 正在重载，等当前重载结束后再排队
+                self.__deferred += 1
+                return
+            self.__push(module_name, now + self.__delay)
+    def __push(self, module_name: str, due: float):
+
+        self.__due[module_name] = due
+        self.__sequence += 1
+        heapq.heappush(self.__heap, (due, self.__sequence, module_name))
+        self.__condition.notify()
+    def __schedule_loop(self):
+
+        while True:
+            with self.__condition:
+                while True:
+                    # 跳过已被推迟（到期时间已更新）的条目
+                    while self.__heap and self.__due.get(self.__heap[0][2]) != self.__heap[0][0]:
+                        heapq.heappop(self.__heap)
+                    if not self.__heap or len(self.__running) >= self.__max_parallel:
+                        self.__condition.wait()
+                        continue
+                    remaining = self.__heap[0][0] - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self.__condition.wait(remaining)
+                _, _, module_name = heapq.heappop(self.__heap)
+                del self.__due[module_name]
+                job = self.__jobs.pop(module_name)
+                RELOAD_STATS.observe("debounce_wait", time.monotonic() - job["first_event"], module_name)
+                self.__running.add(module_name)
+            self.__executor.submit(self.__execute, module_name, job)
+    def __execute(self, module_name: str, job: dict):
 
+        try:
+            self.__run(module_name, job["files"], job["file"], job["action"])
+        except Exception as e:
+            print(f'\033[91m[LG_HotReload] Reload of {module_name} crashed: {e}\033[0m')
+            traceback.print_exc()
+        finally:
+            now = time.monotonic()
+            with self.__condition:
+                self.__running.discard(module_name)
+                latency = now - job["first_event"]
+                self.__completed += 1
+                self.__latency_total += latency
+                self.__latency_max = max(self.__latency_max, latency)
+                self.__last_latency = latency
+                pending = self.__jobs.get(module_name)
+                if pending is not None:
+                    # 重载期间又有变更：等防抖窗口结束后重跑一次
+                    self.__push(module_name, max(now, pending["last_event"] + self.__delay))
+                self.__condition.notify()
+    def stats(self) -> dict:
+
+        with self.__condition:
+            return {
+                "depth": len(self.__jobs),
+                "running": sorted(self.__running),
+                "max_depth": self.__max_depth,
+                "max_parallel": self.__max_parallel,
+                "submitted": self.__submitted,
+                "coalesced": self.__coalesced,
+                "deferred": self.__deferred,
+                "completed": self.__completed,
+                # 从首个文件事件到重载完成的耗时（秒）
+                "latency_avg": self.__latency_total / self.__completed if self.__completed else 0.0,
+                "latency_max": self.__latency_max,
+                "latency_last": self.__last_latency,
+            }
+def pack_sys_module_name(module_name: str) -> str:
+    """load_custom_node 注册节点包时使用的 sys.modules 键（基于路径，与 ComfyUI 的逻辑一致）"""
+    module_path = os.path.join(CUSTOM_NODE_ROOT[0], module_name)
+    if os.path.isfile(module_path):
+        # 单文件节点包：去掉扩展名的完整路径
+        return os.path.splitext(module_path)[0]
+    # 目录节点包：路径中的 "." 替换为 "_x_"
+    return module_path.replace(".", "_x_")
+def loaded_pack_module(module_name: str):
+    """节点包当前的包模块：ComfyUI 启动时只注册了基于路径的名字，重载后才额外注册目录名"""
+    return sys.modules.get(pack_sys_module_name(module_name)) or sys.modules.get(module_name)
+class DebouncedHotReloader(FileSystemEventHandler):
+    
+    def __init__(self, delay: float = 1.0):
 
-                # 确保模块被正确注册到sys.modules中
+        super().__init__()
+        # 防抖、合并与并发控制交给重载队列，防抖窗口内累积的变更文件供增量重载计算失效范围
+        self.queue: ReloadQueue = ReloadQueue(self.check_and_reload, delay)
+        self.queue.start()
+        self.__stage_lock: threading.Lock = threading.Lock()
+        # 重载专用的事件循环（复用，而不是每次 asyncio.run 新建），只在持有 __stage_lock 时使用
+        self.__loop: asyncio.AbstractEventLoop = asyncio.new_event_loop()
+    def __stage(self, module_name: str, changed_files: set[str] = None) -> dict:
+        """
+        在影子注册表中导入并校验节点包的新版本（调用方持有 __stage_lock）
+
+        成功时返回切换阶段需要的信息，失败时已回滚到旧版本并返回 None。
+        """
+        print(f'\n\033[94m[LG_HotReload] 开始重载模块: {module_name}\033[0m')
+
+        sys_module_name = pack_sys_module_name(module_name)
+        module_path = os.path.join(CUSTOM_NODE_ROOT[0], module_name)
+
+        # 收集需要重新加载的所有模块
+        package_modules = {}
+        module_prefix = module_path if os.path.isfile(module_path) else os.path.join(module_path, '')
+        for name, module in list(sys.modules.items()):
+            if hasattr(module, '__file__') and module.__file__ and \
+               module.__file__.startswith(module_prefix):
+                package_modules[name] = module
+
+        # 增量模式下只清理变更模块及其反向依赖，其余子模块保持原对象不变
+        affected_files = None
+        if HOTRELOAD_INCREMENTAL and changed_files and os.path.isdir(module_path) and \
+           all(x.endswith('.py') for x in changed_files):
+            affected_files = MODULE_DEPENDENCIES.affected_files(module_path, changed_files)
+            affected_files.add(normalize_path(os.path.join(module_path, '__init__.py')))
+        modules_to_reload = {
+            name for name, module in package_modules.items()
+            if affected_files is None or normalize_path(module.__file__) in affected_files
+        }
+        if affected_files is not None:
+            print(f'\033[96m[LG_HotReload] 增量重载: {len(modules_to_reload)}/{len(package_modules)} 个模块\033[0m')
+
+        rollback_state = None
+        try:
+            # 记录需要替换的旧路由（只包含定义在将被重新执行的模块中的路由），实际移除在切换阶段完成
+            old_routes = ROUTE_INDEX.select_module_routes(
+                module_name, None if affected_files is None else modules_to_reload
+            )
+            if not old_routes:
+                print(f'\033[96m[LG_HotReload] 未发现需要清理的路由\033[0m')
+
+            # 新版本注册的路由会追加在当前路由表之后
+            routes_before = len(PromptServer.instance.routes._items)
+            rollback_state = (module_prefix, package_modules, routes_before)
+
+            # 删除所有相关模块
+            started = time.perf_counter()
+            for name in modules_to_reload:
+                if name in sys.modules:
+                    del sys.modules[name]
+            RELOAD_STATS.observe("module_purge", time.perf_counter() - started, module_name)
+
+            # 重新加载自定义节点：在重载线程自己的事件循环中执行，耗时的导入不会阻塞服务器事件循环
+            # 新节点先注册到影子注册表中，旧版本在切换前保持可用
+            registries = ShadowNodeRegistries()
+            started = time.perf_counter()
+            try:
+                with registries, IMPORT_PROFILER.profile(module_name, module_path):
+                    success = self.__loop.run_until_complete(registries.bind(load_custom_node)(module_path))
+            except Exception as e:
+                print(f'\033[91m[LG_HotReload] 调用 load_custom_node 失败: {str(e)}\033[0m')
+                success = False
+            RELOAD_STATS.observe("import", time.perf_counter() - started, module_name)
+
+            if not success:
+                errors = [f'加载模块失败: {module_name}']
+            else:
+                # 保留下来的子模块重新挂到新的父包对象上（import pkg.sub 的写法依赖该属性）
+                for name in package_modules.keys() - modules_to_reload:
+                    parent_name, _, child_name = name.rpartition('.')
+                    parent = sys.modules.get(parent_name)
+                    if parent is not None and not hasattr(parent, child_name):
+                        setattr(parent, child_name, package_modules[name])
+
+                started = time.perf_counter()
+                loaded_module = self.__resolve_loaded_module(module_name, module_path, sys_module_name)
+                new_routes = PromptServer.instance.routes._items[routes_before:]
+                errors = validate_staged_reload(loaded_module, registries.staged['NODE_CLASS_MAPPINGS'], new_routes)
+                RELOAD_STATS.observe("validate", time.perf_counter() - started, module_name)
+
+            if errors:
+                for error in errors:
+                    print(f'\033[91m[LG_HotReload] {error}\033[0m')
+                self.__rollback(module_name, *rollback_state)
+                return None
+
+            return {
+                "module": module_name,
+                "loaded_module": loaded_module,
+                "old_routes": old_routes,
+                "new_routes": new_routes,
+                "staged": registries.staged,
+                "replaced_classes": {
+                    name: nodes.NODE_CLASS_MAPPINGS.get(name) for name in registries.staged['NODE_CLASS_MAPPINGS']
+                },
+                "replaced_modules": {
+                    name: package_modules[name] for name in modules_to_reload
+                },
+            }
+        except Exception:
+            if rollback_state is not None:
+                self.__rollback(module_name, *rollback_state)
+            raise
+    def __reload(self, modules: dict[str, set[str]]) -> dict[str, bool]:
+        """
+        重载一批节点包，返回每个节点包是否成功
+
+        各节点包依次导入、校验（失败的单独回滚），之后在服务器事件循环上一次性切换，
+        整批共用一次路由表/router 同步和一次执行缓存失效。
+        """
+        results = {}
+        # 导入与切换阶段会改动 sys.modules、nodes 的全局注册表和路由表，多批之间串行执行
+        with self.__stage_lock:
+            batch = []
+            for module_name, changed_files in modules.items():
                 try:
-                    import importlib.util
-                    # 构建完整的模块名（包含custom_nodes前缀）
-                    full_module_name = f"custom_nodes.{module_name}"
-                    
-                    if os.path.isfile(module_path):
-                        # 处理单个.py文件
-                        spec = importlib.util.spec_from_file_location(full_module_name, module_path)
-                    else:
-                        # 处理模块目录
-                        init_path = os.path.join(module_path, '__init__.py')
-                        spec = importlib.util.spec_from_file_location(full_module_name, init_path)
-
-                    if spec:
-                        # 追踪模块注册前的路由数量
-                        routes_before_register = len(PromptServer.instance.routes)
-
-                        # load_custom_node已经执行了模块代码，这里只需要注册到sys.modules
-                        # 获取已经加载的模块（通过load_custom_node加载）
-                        loaded_module = None
-                        
-                        # 尝试从sys.modules中找到已加载的模块
-                        for mod_name, mod in sys.modules.items():
-                            if (hasattr(mod, '__file__') and mod.__file__ and 
-                                mod.__file__.startswith(module_path)):
-                                loaded_module = mod
-                                break
-                        
-                        if loaded_module:
-                            # 使用已加载的模块，避免重复执行
-                            sys.modules[full_module_name] = loaded_module
-                            sys.modules[module_name] = loaded_module
-
-                        else:
-                            # 如果找不到已加载的模块，则正常加载（备用方案）
-                            module = importlib.util.module_from_spec(spec)
-                            sys.modules[full_module_name] = module
-                            sys.modules[module_name] = module
-                            spec.loader.exec_module(module)
-
-
+                    staged = self.__stage(module_name, changed_files)
                 except Exception as e:
-                    print(f'\033[91m[LG_HotReload] 重新注册模块失败: {str(e)}\033[0m')
+                    logging.error(f"Failed to reload module {module_name}: {e}")
                     traceback.print_exc()
-
-                # 确保节点被正确注册到全局的 NODE_CLASS_MAPPINGS 中
-                module = sys.modules.get(module_name)
-                if module and hasattr(module, 'NODE_CLASS_MAPPINGS'):
-                    # 先清理旧的节点映射
-                    for name in list(nodes.NODE_CLASS_MAPPINGS.keys()):
-                        if name in module.NODE_CLASS_MAPPINGS:
-                            del nodes.NODE_CLASS_MAPPINGS[name]
-
-                    # 重新注册节点
-                    for name, node_cls in module.NODE_CLASS_MAPPINGS.items():
-                        nodes.NODE_CLASS_MAPPINGS[name] = node_cls
-                        node_cls.RELATIVE_PYTHON_MODULE = f"custom_nodes.{module_name}"
-
-                    if hasattr(module, 'NODE_DISPLAY_NAME_MAPPINGS'):
-                        nodes.NODE_DISPLAY_NAME_MAPPINGS.update(module.NODE_DISPLAY_NAME_MAPPINGS)
-
-                # 更新节点类型
-                if module and hasattr(module, 'NODE_CLASS_MAPPINGS'):
-                    for key in module.NODE_CLASS_MAPPINGS.keys():
-                        RELOADED_CLASS_TYPES[key] = 3
-                # 重新注册API路由（到动态路由表）
-                register_module_routes(module_name, sys_module_name)
-
-                print(f'\033[92m[LG_HotReload] 模块重载成功: {module_name}\033[0m')
-                return web.Response(text='OK')
-
+                    staged = None
+                results[module_name] = staged is not None
+                if staged is not None:
+                    batch.append(staged)
+            if not batch:
+                return results
+
+            # 路由表、router、节点映射的切换在服务器事件循环上一次完成，
+            # 处理中的请求不会看到半重载的状态
+            try:
+                run_on_server_loop(self.__swap, batch)
             except Exception as e:
-                logging.error(f"Failed to reload module {module_name}: {e}")
+                logging.error(f"Failed to switch modules {', '.join(x['module'] for x in batch)}: {e}")
                 traceback.print_exc()
-                return web.Response(text='FAILED')
+                for item in batch:
+                    results[item["module"]] = False
+                return results
+
+            for item in batch:
+                # 记录被替换下来的旧版本，重载结束后检查它们能否被回收
+                MODULE_GENERATIONS.retire(
+                    item["module"],
+                    {name: module for name, module in item["replaced_modules"].items() if sys.modules.get(name) is not module},
+                    item["replaced_classes"]
+                )
+                print(f'\033[92m[LG_HotReload] 模块重载成功: {item["module"]}\033[0m')
+        return results
+    def __rollback(self, module_name: str, module_prefix: str, package_modules: dict, routes_before: int):
+        """新版本加载或校验失败时恢复旧版本：sys.modules 还原，新注册的路由移除"""
+        try:
+            for name, module in list(sys.modules.items()):
+                module_file = getattr(module, '__file__', None)
+                if module_file and module_file.startswith(module_prefix) and package_modules.get(name) is not module:
+                    del sys.modules[name]
+            sys.modules.update(package_modules)
+            new_routes = PromptServer.instance.routes._items[routes_before:]
+            if new_routes:
+                run_on_server_loop(self.__discard_routes, module_name, new_routes)
+            print(f'\033[93m[LG_HotReload] 已回滚，继续使用上一个版本: {module_name}\033[0m')
+        except Exception as e:
+            print(f'\033[91m[LG_HotReload] 回滚失败: {str(e)}\033[0m')
+            traceback.print_exc()
+    def __discard_routes(self, module_name: str, routes: list):
+
+        ROUTE_INDEX.sync_routes()
+        ROUTE_INDEX.remove_routes(module_name, routes)
+        ROUTE_INDEX.release_handlers(routes)
+    def __resolve_loaded_module(self, module_name: str, module_path: str, sys_module_name: str):
+        """找到 load_custom_node 加载的包模块，必要时用备用方案加载"""
+        try:
+            # 构建完整的模块名（包含custom_nodes前缀）
+            full_module_name = f"custom_nodes.{module_name}"
+
+            if os.path.isfile(module_path):
+                # 处理单个.py文件
+                spec = importlib.util.spec_from_file_location(full_module_name, module_path)
+            else:
+                # 处理模块目录
+                init_path = os.path.join(module_path, '__init__.py')
+                spec = importlib.util.spec_from_file_location(full_module_name, init_path)
+            if not spec:
+                return None
+
+            # load_custom_node已经执行了模块代码，这里只需要找到它
+            # 优先 load_custom_node 注册的包本身（增量重载时 sys.modules 中还保留着包内未变化的子模块）
+            loaded_module = sys.modules.get(sys_module_name)
+            if loaded_module is None:
+                for mod_name, mod in list(sys.modules.items()):
+                    if (hasattr(mod, '__file__') and mod.__file__ and
+                        mod.__file__.startswith(module_path)):
+                        loaded_module = mod
+                        break
+            if loaded_module is None:
+                # 如果找不到已加载的模块，则正常加载（备用方案）
+                loaded_module = importlib.util.module_from_spec(spec)
+                sys.modules[full_module_name] = loaded_module
+                spec.loader.exec_module(loaded_module)
+            return loaded_module
+        except Exception as e:
+            print(f'\033[91m[LG_HotReload] 重新注册模块失败: {str(e)}\033[0m')
+            traceback.print_exc()
+            return None
+    def __swap(self, batch: list[dict]):
+        """切换到新版本：路由表、router handler、sys.modules 别名、节点映射、动态路由表（整批一次完成）"""
+        stats_module = batch[0]["module"] if len(batch) == 1 else None
+        # 路由表和 router 按新旧版本的差量一次更新
+        try:
+            started = time.perf_counter()
+            summary = ROUTE_INDEX.apply([(item["module"], item["old_routes"], item["new_routes"]) for item in batch])
+            RELOAD_STATS.observe("route_cleanup", time.perf_counter() - started, stats_module)
+            for module_name, counts in summary.items():
+                if any(counts.values()):
+                    print(f'\033[96m[LG_HotReload] 路由变化 {module_name}: 新增 {counts["added"]}，替换 {counts["replaced"]}，移除 {counts["removed"]}\033[0m')
+        except Exception as e:
+            print(f'\033[91m[LG_HotReload] 路由同步失败: {str(e)}\033[0m')
+            traceback.print_exc()
+        finally:
+            for item in batch:
+                ROUTE_INDEX.release_handlers(item["old_routes"])
+
+        started = time.perf_counter()
+        reloaded_classes = []
+        for item in batch:
+            module_name, module = item["module"], item["loaded_module"]
+            # 确保模块被正确注册到sys.modules中
+            if module is not None:
+                sys.modules[f"custom_nodes.{module_name}"] = module
+                sys.modules[module_name] = module
+
+            # 把影子注册表中的新节点写入全局的 NODE_CLASS_MAPPINGS
+            staged = item["staged"]
+            node_classes = staged['NODE_CLASS_MAPPINGS']
+            for node_cls in node_classes.values():
+                node_cls.RELATIVE_PYTHON_MODULE = f"custom_nodes.{module_name}"
+            # 单次 update 完成替换，执行线程不会看到部分更新的映射
+            nodes.NODE_CLASS_MAPPINGS.update(node_classes)
+            nodes.NODE_DISPLAY_NAME_MAPPINGS.update(staged['NODE_DISPLAY_NAME_MAPPINGS'])
+            nodes.EXTENSION_WEB_DIRS.update(staged['EXTENSION_WEB_DIRS'])
+            reloaded_classes.extend(node_classes.keys())
+
+        # 更新节点类型（整批只推进一次代数，执行缓存只失效一次）
+        if reloaded_classes:
+            mark_classes_reloaded(reloaded_classes)
+        # 重新注册API路由（到动态路由表）
+        for item in batch:
+            register_module_routes(item["module"])
+        RELOAD_STATS.observe("router_sync", time.perf_counter() - started, stats_module)
     def on_created(self, event):
         
         if event.is_directory:
@@ -442,164 +2322,526 @@ class DebouncedHotReloader(FileSystemEventHandler):
         if event.is_directory:
             return
         self.handle_file_event(event.src_path)
+    def __reject(self, module_name: str, errors: list[dict], file_path: str, action: str, changed_files: set[str], duration: float):
+        """预检失败：记录并把错误推送给前端"""
+        for error in errors:
+            location = f'{error.get("file")}:{error.get("line")}' if error.get("line") else error.get("file") or module_name
+            print(f'\033[91m[LG_HotReload] 预检失败，未重载 {module_name}: {error["type"]}: {error["message"]} ({location})\033[0m')
+        PACK_INVENTORY.record_reload(module_name, False, duration)
+        if HOTRELOAD_JOURNAL:
+            RELOAD_JOURNAL.record_reload(
+                module_name, False, duration, action=action,
+                file=os.path.relpath(file_path, CUSTOM_NODE_ROOT[0]) if file_path else None,
+                files=len(changed_files), error=f'{errors[0]["type"]}: {errors[0]["message"]}'
+            )
+        if hasattr(PromptServer.instance, "send_sync"):
+            PromptServer.instance.send_sync("hot_reload_error", {
+                "module": module_name,
+                "file": file_path,
+                "errors": errors,
+                "timestamp": time.time(),
+            })
     def handle_file_event(self, file_path: str):
         
-        if not any(ext == '*' for ext in HOTRELOAD_EXTENSIONS):
-            if not any(file_path.endswith(ext) for ext in HOTRELOAD_EXTENSIONS):
-                return
-        if is_hidden_file(file_path):
+        started = time.perf_counter()
+        if normalize_path(file_path) in IGNORED_FILES:
+            return
+        web_asset = WebAssetCache.locate(file_path)
+        if web_asset is not None:
+            self.handle_web_asset_event(file_path, *web_asset)
+            return
+        if not is_watched_extension(file_path):
             return
         relative_path: str = os.path.relpath(file_path, CUSTOM_NODE_ROOT[0])
+        if is_pruned_path(relative_path) or is_hidden_file(file_path):
+            return
         root_dir: str = relative_path.split(os.path.sep)[0]
-        if HOTRELOAD_OBSERVE_ONLY and root_dir not in HOTRELOAD_OBSERVE_ONLY:
+        if not is_module_observed(root_dir):
             return
-        elif root_dir in EXCLUDE_MODULES:
+        # 内容未变化（编辑器 touch、格式化无改动、git 切换到相同内容）时不重载
+        action = FILE_FINGERPRINTS.check(file_path)
+        if action is None:
             return
-        self.schedule_reload(root_dir, file_path)
+        if action != "modified":
+            PACK_INVENTORY.adjust_files(root_dir, 1 if action == "added" else -1)
+            if relative_path == os.path.join(root_dir, '__init__.py'):
+                PACK_INVENTORY.update(root_dir, package=action == "added")
+        self.schedule_reload(root_dir, file_path, action)
+        RELOAD_STATS.observe("event_to_schedule", time.perf_counter() - started, root_dir)
+    def handle_web_asset_event(self, file_path: str, module_name: str, relative_path: str):
+        """前端资源变更：只通知浏览器重新加载这一个文件"""
+        relative_to_root = os.path.relpath(file_path, CUSTOM_NODE_ROOT[0])
+        if is_pruned_path(relative_to_root) or is_hidden_file(file_path):
+            return
+        action = FILE_FINGERPRINTS.check(file_path)
+        if action is None:
+            return
+        WEB_ASSETS.forget(normalize_path(file_path))
+        version = FILE_FINGERPRINTS.fingerprint(file_path) if action != "deleted" else None
+        print(f'\033[96m[LG_HotReload] 前端资源变更: {module_name}/{relative_path}\033[0m')
+        if hasattr(PromptServer.instance, "send_sync"):
+            PromptServer.instance.send_sync("hot_reload_web_update", {
+                "module": module_name,
+                "path": relative_path,
+                "url": f"/extensions/{module_name}/{relative_path}",
+                "version": version,
+                "action": action,
+                "kind": os.path.splitext(relative_path)[1].lstrip('.').lower(),
+                "timestamp": time.time(),
+            })
     def on_modified(self, event):
         
         if event.is_directory:
             return
         self.handle_file_event(event.src_path)
-    def schedule_reload(self, module_name: str, file_path: str):
+    def on_moved(self, event):
+        
+        # 编辑器的原子保存（写入临时文件后重命名）以移动事件出现
+        if event.is_directory:
+            return
+        self.handle_file_event(event.dest_path)
+    def schedule_reload(self, module_name: str, file_path: str, action: str = "modified"):
 
-        current_time: float = time.time()
-        self.__last_modified[module_name] = current_time
-        with self.__lock:
-            if module_name in self.__reload_timers:
-                self.__reload_timers[module_name].cancel()
-            timer = threading.Timer(
-                self.__delay,
-                self.check_and_reload,
-                args=[module_name, current_time, file_path]
-            )
-            self.__reload_timers[module_name] = timer
-            timer.start()
+        self.queue.submit(module_name, file_path, action)
 
-    def check_and_reload(self, module_name: str, scheduled_time: float, file_path: str):
+    def check_and_reload(self, module_name: str, changed_files: set[str], file_path: str, action: str = "modified"):
 
-        with self.__lock:
-            if self.__last_modified[module_name] != scheduled_time:
-                return
-            # 检查是否在冷却期内
-            current_time = time.time()
-            if (current_time - self.__last_successful_reload[module_name]) < self.__successful_reload_cooldown:
-                print(f"\033[93m[LG_HotReload] Module {module_name} was recently reloaded, skipping...\033[0m")
-                return
+        self.reload_modules({module_name: changed_files}, file_path, action)
+    def reload_modules(self, modules: dict[str, set[str]], file_path: str = None, action: str = "modified") -> dict[str, str]:
+        """
+        重载一批节点包，返回 {节点包: "ok" | "failed" | "rejected"}
+
+        changed_files 为空时整包重载。整批共用一次切换与缓存失效，前端只收到一条更新消息。
+        """
+        reload_started = time.perf_counter()
+        stats_module = next(iter(modules)) if len(modules) == 1 else None
+        results = {}
         try:
+            # 预检：在子进程中编译变更的文件（可选试导入），有错误的节点包直接拒绝，正在运行的版本不受影响
+            jobs = {}
+            for module_name, changed_files in modules.items():
+                if HOTRELOAD_PREFLIGHT:
+                    started = time.perf_counter()
+                    files = changed_files or set(iter_module_files(os.path.join(CUSTOM_NODE_ROOT[0], module_name), ('.py',)))
+                    errors = PREFLIGHT.check(module_name, files)
+                    RELOAD_STATS.observe("preflight", time.perf_counter() - started, module_name)
+                    if errors:
+                        self.__reject(module_name, errors, file_path, action, files, time.perf_counter() - reload_started)
+                        results[module_name] = "rejected"
+                        continue
+                jobs[module_name] = changed_files
+            if not jobs:
+                return results
+
             # 获取重载前的节点信息
-            old_nodes = set()
-            old_module = sys.modules.get(module_name)
-            if old_module and hasattr(old_module, 'NODE_CLASS_MAPPINGS'):
-                old_nodes = set(old_module.NODE_CLASS_MAPPINGS.keys())
+            old_classes = {}
+            for module_name in jobs:
+                old_module = loaded_pack_module(module_name)
+                if old_module and hasattr(old_module, 'NODE_CLASS_MAPPINGS'):
+                    old_classes[module_name] = dict(old_module.NODE_CLASS_MAPPINGS)
+            old_module = None
+            # 重载前的接口指纹（首次重载时现算，之后沿用上次重载记录的值）
+            old_fingerprints = fingerprint_node_definitions(
+                {x for classes in old_classes.values() for x in classes}
+            )
 
-            # 重载模块
-            self.__reload(module_name)
+            # 重载模块（失败的节点包已回滚到旧版本，不通知前端）
+            outcome = self.__reload(jobs)
+            duration = time.perf_counter() - reload_started
+            for module_name, success in outcome.items():
+                results[module_name] = "ok" if success else "failed"
+                PACK_INVENTORY.record_reload(module_name, success, duration)
+                if HOTRELOAD_JOURNAL:
+                    changed_files = jobs[module_name]
+                    RELOAD_JOURNAL.record_reload(
+                        module_name, success, duration, action=action,
+                        file=os.path.relpath(file_path, CUSTOM_NODE_ROOT[0]) if file_path else None,
+                        files=len(changed_files) if changed_files else 0
+                    )
+            reloaded = [x for x in jobs if outcome.get(x)]
+            if not reloaded:
+                return results
 
             # 添加调试信息
             print(f'\033[94m[LG_HotReload] 检查节点注册状态:\033[0m')
-            module = sys.modules.get(module_name)
-            if module and hasattr(module, 'NODE_CLASS_MAPPINGS'):
-                for node_class in module.NODE_CLASS_MAPPINGS.keys():
-                    if node_class in nodes.NODE_CLASS_MAPPINGS:
-                        print(f'\033[92m[LG_HotReload] 节点 {node_class} 已成功注册\033[0m')
-                    else:
-                        print(f'\033[91m[LG_HotReload] 节点 {node_class} 注册失败\033[0m')
-
-            # 获取重载后的节点信息
-            new_nodes = set()
-            if module and hasattr(module, 'NODE_CLASS_MAPPINGS'):
-                new_nodes = set(module.NODE_CLASS_MAPPINGS.keys())
+            old_classes = {
+                class_type: cls for module_name in reloaded for class_type, cls in old_classes.get(module_name, {}).items()
+            }
+            new_classes = {}
+            for module_name in reloaded:
+                module = loaded_pack_module(module_name)
+                if module and hasattr(module, 'NODE_CLASS_MAPPINGS'):
+                    for node_class in module.NODE_CLASS_MAPPINGS.keys():
+                        if node_class in nodes.NODE_CLASS_MAPPINGS:
+                            print(f'\033[92m[LG_HotReload] 节点 {node_class} 已成功注册\033[0m')
+                        else:
+                            print(f'\033[91m[LG_HotReload] 节点 {node_class} 注册失败\033[0m')
+                    # 获取重载后的节点信息
+                    new_classes.update(module.NODE_CLASS_MAPPINGS)
+            module = None
+            old_nodes = set(old_classes.keys())
+            new_nodes = set(new_classes.keys())
 
             # 计算节点变化
             added_nodes = new_nodes - old_nodes
             removed_nodes = old_nodes - new_nodes
-            updated_nodes = new_nodes & old_nodes
-
-            # 确定文件变更类型
-            action = "deleted" if not os.path.exists(file_path) else "added" if file_path not in self.__hashes else "modified"
-
-            # 发送更新消息给前端
+            for class_type in removed_nodes:
+                NODE_DEFINITION_FINGERPRINTS.pop(class_type, None)
+
+            # 按接口指纹区分：接口变化的节点前端需要重新注册；
+            # 只有实现变化的节点前端无需处理（执行缓存已在切换时失效）
+            definitions = collect_node_definitions(new_nodes)
+            new_fingerprints = {x: definition_fingerprint(definition) for x, definition in definitions.items()}
+            NODE_DEFINITION_FINGERPRINTS.update(new_fingerprints)
+            updated_nodes, implementation_nodes = set(), set()
+            for class_type in new_nodes & old_nodes:
+                fingerprint = new_fingerprints.get(class_type)
+                if fingerprint is None or fingerprint != old_fingerprints.get(class_type):
+                    updated_nodes.add(class_type)
+                elif new_classes[class_type] is not old_classes[class_type]:
+                    implementation_nodes.add(class_type)
+            # 节点定义直接随消息下发，前端无需再逐个请求 /object_info
+            definitions = {x: definitions[x] for x in added_nodes | updated_nodes if x in definitions}
+            if implementation_nodes:
+                print(f'\033[96m[LG_HotReload] 仅实现变化（前端无需更新）: {len(implementation_nodes)} 个节点\033[0m')
+
+            # 发送更新消息给前端（整批一条）
             update_message = {
                 "type": "hot_reload_update",
                 "data": {
-                    "module": module_name,
+                    "module": ", ".join(reloaded),
+                    "modules": reloaded,
                     "action": action,
                     "file": file_path,
                     "timestamp": time.time(),
                     "changes": {
                         "added": list(added_nodes),
                         "removed": list(removed_nodes),
-                        "updated": list(updated_nodes)
-                    }
+                        "updated": list(updated_nodes),
+                        "implementation": list(implementation_nodes)
+                    },
+                    "definitions": definitions
                 }
             }
 
+            started = time.perf_counter()
             if hasattr(PromptServer.instance, "send_sync"):
                 PromptServer.instance.send_sync(
                     "hot_reload_update",
                     update_message["data"]
                 )
+            RELOAD_STATS.observe("notify", time.perf_counter() - started, stats_module)
+            RELOAD_STATS.observe("total", time.perf_counter() - reload_started, stats_module)
 
+            print(f'\033[92m[LG_HotReload] Successfully reloaded modules: {", ".join(reloaded)}\033[0m')
 
-
-            self.__last_successful_reload[module_name] = time.time()
-            print(f'\033[92m[LG_HotReload] Successfully reloaded module: {module_name}\033[0m')
+            # 释放本函数对旧版本的引用后再回收
+            del old_classes, new_classes
+            if HOTRELOAD_GC:
+                MODULE_GENERATIONS.reclaim(stats_module)
             
         except requests.RequestException as e:
             print(f'\033[91m[LG_HotReload] Reload failed: {e}\033[0m')
         except Exception as e:
             print(f'\033[91m[LG_HotReload] Error occurred: {e}\033[0m')
             traceback.print_exc()
+        for module_name in modules:
+            results.setdefault(module_name, "failed")
+        return results
+if InotifyEmitter is not None:
+    class PrunedInotifyEmitter(InotifyEmitter):
+        """
+        递归监听时跳过被裁剪的目录（.git、venv、node_modules 等）的 inotify 发射器
+
+        watchdog 的递归监听会为节点包下的每个目录添加内核监听；这里以非递归方式创建 inotify 实例，
+        再在同一实例中逐个添加未被裁剪目录的监听，并跟进目录的新建与移动。
+        inotify_rm_watch 产生的 IN_IGNORED 会让 watchdog 的读取线程出错，所以监听只增不删：
+        被删除目录的监听由内核回收，移入被裁剪目录的监听只重新映射路径，其事件在这里丢弃。
+        非递归监听（custom_nodes 根目录）保持 watchdog 原有行为。
+        """
+        def __init__(self, *args, **kwargs):
+
+            super().__init__(*args, **kwargs)
+            self.__directories: set[str] = set()
+        def on_thread_start(self):
+
+            if not self.watch.is_recursive:
+                super().on_thread_start()
+                return
+            self._inotify = InotifyBuffer(
+                os.fsencode(self.watch.path), recursive=False, event_mask=self.get_event_mask_from_filter()
+            )
+            self.__directories.clear()
+            self.__watch_tree(self.watch.path)
+        def __add_watch(self, directory: str):
+
+            self._inotify._inotify.add_watch(os.fsencode(directory))
+            self.__directories.add(directory)
+        def __watch_tree(self, path: str) -> list[str]:
+            """为 path 下未被裁剪的目录添加监听（不跟随符号链接），返回其中已有的文件"""
+            files = []
+            pending = [path]
+            while pending:
+                directory = pending.pop()
+                # 先添加监听再列目录，两者之间新建的条目才不会遗漏
+                if directory != self.watch.path:
+                    self.__add_watch(directory)
+                try:
+                    with os.scandir(directory) as it:
+                        entries = list(it)
+                except OSError:
+                    continue
+                for entry in entries:
+                    try:
+                        is_dir = entry.is_dir(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    if not is_dir:
+                        files.append(entry.path)
+                    elif not is_pruned_dir(entry.name):
+                        pending.append(entry.path)
+            return files
+        def __is_pruned(self, path: str) -> bool:
+
+            relative_path = os.path.relpath(path, self.watch.path)
+            if relative_path == os.curdir:
+                return False
+            return relative_path.startswith(os.pardir) or any(is_pruned_dir(part) for part in relative_path.split(os.path.sep))
+        def __track_directory(self, event):
+            """目录新建或移动时更新内核监听；新建目录中已有的文件补发创建事件（移动的子事件由 watchdog 生成）"""
+            if isinstance(event, DirMovedEvent):
+                prefix = event.src_path + os.path.sep
+                for directory in [x for x in self.__directories if x == event.src_path or x.startswith(prefix)]:
+                    self.__directories.discard(directory)
+                    # 对移动后的同一目录再次 add_watch 会复用原监听并更新 watchdog 记录的路径
+                    with contextlib.suppress(OSError):
+                        self.__add_watch(event.dest_path + directory[len(event.src_path):])
+                if not self.__is_pruned(event.dest_path):
+                    with contextlib.suppress(OSError):
+                        self.__watch_tree(event.dest_path)
+                return
+            if isinstance(event, DirDeletedEvent):
+                prefix = event.src_path + os.path.sep
+                self.__directories.difference_update(
+                    [x for x in self.__directories if x == event.src_path or x.startswith(prefix)]
+                )
+                return
+            if self.__is_pruned(event.src_path):
+                return
+            try:
+                files = self.__watch_tree(event.src_path)
+            except OSError as e:
+                logging.warning(f"[LG_HotReload] Failed to watch {event.src_path}: {e}")
+                return
+            # mkdir -p a/b && touch a/b/x.py：监听建立前落盘的文件不会产生事件
+            for file_path in files:
+                super().queue_event(FileCreatedEvent(file_path))
+        def queue_event(self, event):
+
+            if not self.watch.is_recursive:
+                super().queue_event(event)
+                return
+            if isinstance(event, (DirCreatedEvent, DirDeletedEvent, DirMovedEvent)):
+                self.__track_directory(event)
+            path = event.dest_path if isinstance(event, (DirMovedEvent, FileMovedEvent)) else event.src_path
+            if self.__is_pruned(path if event.is_directory else os.path.dirname(path)):
+                return
+            super().queue_event(event)
+    class PrunedInotifyObserver(BaseObserver):
+        """使用 PrunedInotifyEmitter 的原生监听器"""
+        def __init__(self, timeout: float = DEFAULT_OBSERVER_TIMEOUT):
+
+            super().__init__(PrunedInotifyEmitter, timeout=timeout)
+else:
+    PrunedInotifyObserver = None
+def create_observer(backend: str) -> BaseObserver:
+    """根据后端名称创建文件监听器"""
+    if backend == "polling":
+        # 轮询快照在扫描阶段即跳过被裁剪的目录，而不是扫描后再过滤事件
+        return PollingObserverVFS(os.stat, pruned_listdir, polling_interval=POLLING_INTERVAL)
+    if PrunedInotifyObserver is not None:
+        return PrunedInotifyObserver()
+    # FSEvents / ReadDirectoryChangesW 的递归监听只占一个句柄，不需要逐目录裁剪
+    return NativeObserver()
+class NodePackRootHandler(FileSystemEventHandler):
+    """custom_nodes 根目录（非递归）的事件：单文件节点包交给重载器，节点包目录的增删触发监听同步"""
+    def __init__(self, service: "HotReloaderService", reloader: "DebouncedHotReloader"):
+
+        super().__init__()
+        self.__service = service
+        self.__reloader = reloader
+    def on_created(self, event):
+
+        if event.is_directory:
+            module_name = os.path.basename(event.src_path)
+            def schedule_new_pack(future):
+                if future.exception() is None and self.__service.is_watching(module_name):
+                    # 新安装的节点包：监听建立前落盘的文件不会产生事件，直接安排一次加载
+                    self.__reloader.schedule_reload(module_name, os.path.join(event.src_path, '__init__.py'))
+            self.__service.sync_watches().add_done_callback(schedule_new_pack)
+            return
+        self.__reloader.handle_file_event(event.src_path)
+    def on_deleted(self, event):
+
+        if event.is_directory:
+            self.__service.sync_watches()
+            return
+        self.__reloader.handle_file_event(event.src_path)
+    def on_moved(self, event):
+
+        if event.is_directory:
+            self.__service.sync_watches()
+    def on_modified(self, event):
+
+        if event.is_directory:
+            return
+        self.__reloader.handle_file_event(event.src_path)
 class HotReloaderService:
     
-    def __init__(self, delay: float = 1.0):
+    def __init__(self, delay: float = 1.0, backend: str = HOTRELOAD_OBSERVER):
 
-        self.__observer: Observer = None
+        self.__observer: BaseObserver = None
         self.__reloader: DebouncedHotReloader = DebouncedHotReloader(delay)
+        self.__backend: str = backend if backend in ("auto", "native", "polling") else "auto"
+        self.__watches: dict = {}
+        self.__watch_lock: threading.Lock = threading.Lock()
+        # 监听的增删统一在这个线程中进行：事件分发线程持有 observer 的内部锁，
+        # 在分发线程中同步等待 __watch_lock 会与正在 schedule/unschedule 的线程互相等待
+        self.__watch_updates: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="HotReload.Watches")
+        # 尚未开始执行的同步请求，之后的请求直接复用它（目录批量增删时只同步一次）
+        self.__pending_sync: Future = None
+        self.__pending_lock: threading.Lock = threading.Lock()
+    @property
+    def backend(self) -> str:
+        return self.__backend
     def start(self):
         
-        self.__observer = Observer()
-        self.__observer.schedule(self.__reloader, CUSTOM_NODE_ROOT[0], recursive=True)
+        if self.__backend != "polling":
+            try:
+                self.__start_observer("native")
+                return
+            except Exception as e:
+                # inotify 句柄耗尽、网络文件系统等情况下原生监听不可用
+                if self.__backend == "native":
+                    raise
+                print(f"\033[93m[LG_HotReload] Native file watcher unavailable ({e}), falling back to polling\033[0m")
+                self.stop()
+        self.__start_observer("polling")
+    def __start_observer(self, backend: str):
+
+        self.__observer = create_observer(backend)
+        self.__observer.schedule(NodePackRootHandler(self, self.__reloader), CUSTOM_NODE_ROOT[0], recursive=False)
         self.__observer.start()
+        self.sync_watches(strict=True).result()
+        self.__backend = backend
+        logging.info(f"[LG_HotReload] Watching {len(self.__watches)} node packs under {CUSTOM_NODE_ROOT[0]} with {type(self.__observer).__name__}")
+    def queue_stats(self) -> dict:
+
+        return self.__reloader.queue.stats()
+    def reload_modules(self, modules: dict[str, set[str]], action: str = "manual") -> dict[str, str]:
+
+        return self.__reloader.reload_modules(modules, None, action)
+    def is_watching(self, module_name: str) -> bool:
+
+        return module_name in self.__watches
+    def sync_watches(self, strict: bool = False) -> Future:
+        """安排一次监听同步，返回其 Future（不在调用线程中执行，事件处理器中也可以安全调用）"""
+        with self.__pending_lock:
+            if self.__pending_sync is not None and not strict:
+                return self.__pending_sync
+            future = self.__watch_updates.submit(self.__sync_watches, strict)
+            if not strict:
+                self.__pending_sync = future
+            return future
+    def __sync_watches(self, strict: bool):
+        """按当前排除列表计算需要监听的节点包，每个节点包一个递归监听，增量增删"""
+        with self.__pending_lock:
+            self.__pending_sync = None
+        with self.__watch_lock:
+            observer = self.__observer
+            if observer is None:
+                return
+            root = CUSTOM_NODE_ROOT[0]
+            try:
+                entries = os.listdir(root)
+            except OSError as e:
+                print(f"\033[91m[LG_HotReload] Failed to list {root}: {e}\033[0m")
+                return
+            # 目录增删时顺带同步节点包清单（复用同一次 listdir）
+            PACK_INVENTORY.refresh(entries)
+            wanted = {
+                item for item in entries
+                if is_module_observed(item) and os.path.isdir(os.path.join(root, item))
+            }
+            for module_name in list(self.__watches.keys() - wanted):
+                try:
+                    observer.unschedule(self.__watches.pop(module_name))
+                except Exception as e:
+                    logging.warning(f"[LG_HotReload] Failed to unwatch {module_name}: {e}")
+            added = sorted(wanted - self.__watches.keys())
+            for module_name in added:
+                try:
+                    self.__watches[module_name] = observer.schedule(
+                        self.__reloader, os.path.join(root, module_name), recursive=True
+                    )
+                except Exception as e:
+                    if strict:
+                        raise
+                    print(f"\033[91m[LG_HotReload] Failed to watch {module_name}: {e}\033[0m")
+            if added:
+                threading.Thread(
+                    target=prime_fingerprints, args=(added,), name="HotReload.FingerprintPrimer", daemon=True
+                ).start()
     def stop(self):
         
         if self.__observer:
             self.__observer.stop()
-            self.__observer.join()
+            if self.__observer.is_alive():
+                self.__observer.join()
+            self.__observer = None
+            self.__watches.clear()
 def monkeypatch():
     
     original_set_prompt = caching.BasicCache.set_prompt
     def set_prompt(self, dynprompt, node_ids, is_changed_cache):
 
-        if not hasattr(self, 'cache_key_set'):
-            RELOADED_CLASS_TYPES.clear()
-            return original_set_prompt(self, dynprompt, node_ids, is_changed_cache)
-        found_keys = []
-        for key, item_list in self.cache_key_set.keys.items():
-            if dfs(item_list, RELOADED_CLASS_TYPES):
-                found_keys.append(key)
-        if len(found_keys):
-            for value_key in list(RELOADED_CLASS_TYPES.keys()):
-                RELOADED_CLASS_TYPES[value_key] -= 1
-                if RELOADED_CLASS_TYPES[value_key] == 0:
-                    del RELOADED_CLASS_TYPES[value_key]
-        for key in found_keys:
-            cache_key = self.cache_key_set.get_data_key(key)
-            if cache_key and cache_key in self.cache:
-                del self.cache[cache_key]
-                del self.cache_key_set.keys[key]
-                del self.cache_key_set.subcache_keys[key]
-        return original_set_prompt(self, dynprompt, node_ids, is_changed_cache)
+        # 新版 ComfyUI 中 set_prompt 是协程，需要在缓存键计算完成后再失效
+        result = original_set_prompt(self, dynprompt, node_ids, is_changed_cache)
+        if inspect.isawaitable(result):
+            async def finish():
+                value = await result
+                invalidate_reloaded_entries(self, dynprompt)
+                return value
+            return finish()
+        invalidate_reloaded_entries(self, dynprompt)
+        return result
     caching.HierarchicalCache.set_prompt = set_prompt
 
+HOT_RELOADER_SERVICE: HotReloaderService = None
+def collect_reload_stats() -> dict:
+    """/hotreload/stats：阶段耗时、节点包耗时、重载队列、文件指纹与缓存失效统计"""
+    stats = RELOAD_STATS.snapshot()
+    stats["queue"] = HOT_RELOADER_SERVICE.queue_stats() if HOT_RELOADER_SERVICE is not None else {}
+    stats["fingerprints"] = FILE_FINGERPRINTS.stats()
+    stats["cache"] = dict(CACHE_INVALIDATION_STATS)
+    return stats
 def setup():
     
+    global HOT_RELOADER_SERVICE
     logging.info("[LG_HotReload] Monkey patching comfy_execution.caching.BasicCache")
     monkeypatch()
-    hot_reloader_service = HotReloaderService(delay=DEBOUNCE_TIME)
-    atexit.register(hot_reloader_service.stop)
-    hot_reloader_service.start()
+    if HOTRELOAD_JOURNAL:
+        # 先用上次运行的指纹预热缓存，之后的预计算只需对比 mtime/size
+        FILE_FINGERPRINTS.warm(RELOAD_JOURNAL.load())
+        FILE_FINGERPRINTS.on_change = RELOAD_JOURNAL.record_fingerprint
+        RELOAD_JOURNAL.start()
+        atexit.register(RELOAD_JOURNAL.flush)
+    HOT_RELOADER_SERVICE = HotReloaderService(delay=DEBOUNCE_TIME)
+    atexit.register(HOT_RELOADER_SERVICE.stop)
+    atexit.register(PREFLIGHT.close)
+    atexit.register(StopTerminalService)
+    HOT_RELOADER_SERVICE.start()
+    StartTerminalService()
 setup()
 WEB_DIRECTORY = "./web"
 NODE_CLASS_MAPPINGS = {"HotReload_Terminal": HotReload_Terminal}
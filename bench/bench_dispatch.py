@@ -0,0 +1,109 @@
+"""
+动态 API 分发基准：DynamicRouteTable.resolve 的单次查找延迟
+
+按节点包注册数千条路由（静态路径、{id} 参数路径与 {path:.*} 尾部参数路径各占三分之一），
+对命中与未命中的请求测量每次查找的耗时，并与逐条正则匹配的线性分发对照：
+
+    python bench/bench_dispatch.py
+    python bench/bench_dispatch.py --routes 100,1000,10000 --lookups 200000
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "tests"))
+from comfy_stubs import load_plugin  # noqa: E402
+
+
+async def handler(request):
+    return None
+
+
+def make_routes(count: int) -> list[tuple[str, str, str]]:
+    """(方法, 注册路径, 可命中的请求路径)"""
+    routes = []
+    for index in range(count):
+        kind = index % 3
+        if kind == 0:
+            routes.append(("GET", f"/pack_{index}/status", f"/pack_{index}/status"))
+        elif kind == 1:
+            routes.append(("POST", f"/pack_{index}/items/{{item_id}}", f"/pack_{index}/items/{index * 7}"))
+        else:
+            routes.append(("GET", f"/pack_{index}/files/{{path:.*}}", f"/pack_{index}/files/a/b/{index}.png"))
+    return routes
+
+
+class LinearRouteTable:
+    """对照组：按注册顺序逐条用整条路径的正则匹配"""
+    def __init__(self, hotreload):
+
+        self.hotreload = hotreload
+        self.routes: list[tuple[str, re.Pattern, object]] = []
+    def add(self, method: str, path: str, handler):
+
+        segments = self.hotreload.split_route_path(path)
+        pattern = "/".join(self.hotreload.compile_route_segment(x).pattern for x in segments)
+        self.routes.append((method, re.compile(pattern), handler))
+    def resolve(self, method: str, path: str):
+
+        for route_method, pattern, route_handler in self.routes:
+            match = pattern.fullmatch(path)
+            if match and route_method == method:
+                return route_handler, match.groupdict(), {route_method}
+        return None, {}, None
+
+
+def time_lookups(table, requests: list[tuple[str, str]], lookups: int) -> float:
+    """平均每次 resolve 的耗时（微秒）"""
+    resolve = table.resolve
+    rounds = max(1, lookups // len(requests))
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for method, path in requests:
+            resolve(method, path)
+    return 1e6 * (time.perf_counter() - started) / (rounds * len(requests))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--routes", default="100,1000,5000", help="comma separated route counts")
+    parser.add_argument("--lookups", type=int, default=100_000, help="lookups per measurement")
+    parser.add_argument("--no-linear", action="store_true", help="skip the linear scan baseline")
+    args = parser.parse_args()
+
+    hotreload = load_plugin()
+    random.seed(0)
+    print(f"{'routes':>8}{'kind':>10}{'table (us)':>13}{'linear (us)':>13}")
+    for count in [int(x) for x in args.routes.split(",") if x.strip()]:
+        routes = make_routes(count)
+        table = hotreload.DynamicRouteTable()
+        linear = LinearRouteTable(hotreload)
+        for method, path, _ in routes:
+            table.add(method, path, handler)
+            linear.add(method, path, handler)
+        assert len(table) == count
+        samples = random.sample(routes, min(len(routes), 300))
+        requests = {
+            "static": [(m, p) for m, r, p in samples if "{" not in r],
+            "param": [(m, p) for m, r, p in samples if "{item_id}" in r],
+            "tail": [(m, p) for m, r, p in samples if "{path:.*}" in r],
+            "miss": [("GET", f"/missing_{x}/status") for x in range(100)],
+        }
+        for kind, batch in requests.items():
+            for method, path in batch:
+                found = table.resolve(method, path)[0]
+                assert (found is None) == (kind == "miss"), (kind, method, path)
+            table_us = time_lookups(table, batch, args.lookups)
+            # 线性扫描在路由多时很慢，按路由数缩减查找次数
+            linear_us = None if args.no_linear else time_lookups(linear, batch, max(len(batch), args.lookups * 100 // count))
+            print(f"{count:>8}{kind:>10}{table_us:>13.2f}" + (f"{linear_us:>13.2f}" if linear_us is not None else f"{'-':>13}"))
+
+    hotreload.HOT_RELOADER_SERVICE.stop()
+    hotreload.StopTerminalService()
+
+
+if __name__ == "__main__":
+    main()
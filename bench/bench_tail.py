@@ -0,0 +1,104 @@
+"""
+Terminal 日志尾随基准：LogFileTail.ReadNew 每个轮询周期的耗时与日志大小无关
+
+为每个大小生成一份 ComfyUI 风格的日志，之后每个周期追加一行并调用一次 ReadNew，
+与旧实现（每个周期从头逐行读取整个文件、跳过已检查的行）对照：
+
+    python bench/bench_tail.py
+    python bench/bench_tail.py --sizes 1,100,500 --ticks 200
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "tests"))
+from comfy_stubs import load_plugin  # noqa: E402
+
+
+LINE = "[2024-05-01 12:00:00.123] got prompt: executing node 42 of workflow, cache hit for 17 nodes\n"
+
+
+def write_log(path: str, size_mb: int):
+
+    block = LINE * (1024 * 1024 // len(LINE))
+    with open(path, "w", encoding="utf-8") as f:
+        written = 0
+        while written < size_mb * 1024 * 1024:
+            f.write(block)
+            written += len(block)
+
+
+def append_line(path: str, index: int):
+
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(f"[2024-05-01 12:00:{index % 60:02d}.456] tick {index}\n")
+
+
+def rescan(path: str, checked_line: int) -> tuple[list[str], int]:
+    """旧实现：从头逐行读取，只保留 checked_line 之后的行"""
+    lines = []
+    with open(path, "r", encoding="utf-8", errors="replace") as file:
+        for current_line, line in enumerate(file):
+            if current_line > checked_line:
+                checked_line = current_line
+                lines.append(line)
+    return lines, checked_line
+
+
+def measure_tail(tail_class, path: str, ticks: int) -> list[float]:
+
+    tail = tail_class(path)
+    tail.ReadNew()
+    timings = []
+    for index in range(ticks):
+        append_line(path, index)
+        started = time.perf_counter()
+        lines, _ = tail.ReadNew()
+        timings.append(time.perf_counter() - started)
+        assert len(lines) == 1, lines
+    return timings
+
+
+def measure_rescan(path: str, ticks: int) -> list[float]:
+
+    _, checked_line = rescan(path, -1)
+    timings = []
+    for index in range(ticks):
+        append_line(path, index)
+        started = time.perf_counter()
+        lines, checked_line = rescan(path, checked_line)
+        timings.append(time.perf_counter() - started)
+        assert len(lines) == 1, lines
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="1,100,500", help="comma separated log sizes in MB")
+    parser.add_argument("--ticks", type=int, default=200, help="ticks (appended lines) per log size")
+    parser.add_argument("--rescan-ticks", type=int, default=5, help="ticks for the old full rescan (0 to skip)")
+    args = parser.parse_args()
+
+    hotreload = load_plugin()
+    print(f"{'size (MB)':>10}{'tail p50 (us)':>15}{'tail max (us)':>15}{'rescan p50 (ms)':>17}")
+    with tempfile.TemporaryDirectory(prefix="hotreload_tail_") as work_dir:
+        for size_mb in [int(x) for x in args.sizes.split(",") if x.strip()]:
+            path = os.path.join(work_dir, "comfyui_8188.log")
+            write_log(path, size_mb)
+            timings = measure_tail(hotreload.LogFileTail, path, args.ticks)
+            rescan_ms = None
+            if args.rescan_ticks > 0:
+                rescan_ms = 1000 * statistics.median(measure_rescan(path, args.rescan_ticks))
+            print(f"{size_mb:>10}{1e6 * statistics.median(timings):>15.1f}{1e6 * max(timings):>15.1f}"
+                  + (f"{rescan_ms:>17.1f}" if rescan_ms is not None else f"{'-':>17}"))
+            os.remove(path)
+
+    hotreload.HOT_RELOADER_SERVICE.stop()
+    hotreload.StopTerminalService()
+
+
+if __name__ == "__main__":
+    main()
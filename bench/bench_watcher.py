@@ -0,0 +1,153 @@
+"""
+文件监听后端基准：空闲 CPU 占用与变更检测延迟
+
+在临时目录中生成合成的 custom_nodes 树（默认 10 万个文件，其中大部分位于 .git / venv / node_modules 中），
+分别用原生监听与轮询后端监听全部节点包，测量：
+
+- 建立监听的耗时、inotify 实例数与内核监听数（仅 Linux）
+- 空闲期间的进程 CPU 占用（扣除插件加载后、开始监听前的基线）
+- 修改文件到 handle_file_event 安排重载的延迟
+
+    python bench/bench_watcher.py
+    python bench/bench_watcher.py --files 20000 --idle 5 --backends native
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "tests"))
+from comfy_stubs import CUSTOM_NODES_DIR, load_plugin  # noqa: E402
+
+
+# 每个节点包内文件的分布：源码目录与被裁剪目录
+SOURCE_DIRS = ("", "nodes", "nodes/utils", "web/js")
+PRUNED_DIRS = (".git/objects", "venv/lib/site-packages/pkg", "node_modules/dep")
+SOURCE_FILES_PER_PACK = 24
+
+
+def build_tree(packs: int, total_files: int) -> list[str]:
+    """生成合成的节点包树，返回可修改的源码文件列表"""
+    pruned_per_pack = max(0, total_files // packs - SOURCE_FILES_PER_PACK)
+    sources = []
+    for index in range(packs):
+        pack_dir = os.path.join(CUSTOM_NODES_DIR, f"pack_{index:03d}")
+        for number in range(SOURCE_FILES_PER_PACK):
+            sub_dir = SOURCE_DIRS[number % len(SOURCE_DIRS)]
+            extension = ".js" if sub_dir == "web/js" else ".py"
+            file_name = "__init__.py" if number == 0 else f"module_{number}{extension}"
+            file_path = os.path.join(pack_dir, sub_dir, file_name)
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            with open(file_path, "w") as f:
+                f.write(f"VALUE = {number}\n")
+            if extension == ".py":
+                sources.append(file_path)
+        for number in range(pruned_per_pack):
+            sub_dir = os.path.join(PRUNED_DIRS[number % len(PRUNED_DIRS)], f"d{number // 200}")
+            file_path = os.path.join(pack_dir, sub_dir, f"f{number}")
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            open(file_path, "w").close()
+    return sources
+
+
+def count_inotify() -> tuple[int, int]:
+    """本进程持有的 (inotify 实例数, 内核监听数)，读取 /proc/self/fdinfo；非 Linux 返回 (0, 0)"""
+    instances = watches = 0
+    fdinfo = "/proc/self/fdinfo"
+    if not os.path.isdir(fdinfo):
+        return 0, 0
+    for fd in os.listdir(fdinfo):
+        try:
+            with open(os.path.join(fdinfo, fd)) as f:
+                count = sum(1 for line in f if line.startswith("inotify wd:"))
+        except OSError:
+            continue
+        if count:
+            instances += 1
+            watches += count
+    return instances, watches
+
+
+def measure_idle(seconds: float) -> float:
+    """seconds 秒内进程 CPU 时间占墙钟时间的比例（%）"""
+    cpu, wall = time.process_time(), time.perf_counter()
+    time.sleep(seconds)
+    return 100 * (time.process_time() - cpu) / (time.perf_counter() - wall)
+
+
+def measure_latency(service, sources: list[str], changes: int, timeout: float) -> list[float]:
+    """逐个修改文件，返回从写入到安排重载的延迟（秒）"""
+    reloader = service._HotReloaderService__reloader
+    detected = threading.Event()
+    target = {}
+
+    def schedule_reload(module_name, file_path, action="modified"):
+        if file_path == target.get("path"):
+            target["latency"] = time.perf_counter() - target["started"]
+            detected.set()
+    reloader.schedule_reload = schedule_reload
+
+    latencies = []
+    for file_path in random.sample(sources, min(changes, len(sources))):
+        detected.clear()
+        target.update(path=file_path, started=time.perf_counter())
+        with open(file_path, "a") as f:
+            f.write(f"# changed {time.time()}\n")
+        if detected.wait(timeout):
+            latencies.append(target["latency"])
+        else:
+            print(f"  change not detected within {timeout}s: {os.path.relpath(file_path, CUSTOM_NODES_DIR)}")
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--files", type=int, default=100_000, help="total number of files in the synthetic tree")
+    parser.add_argument("--packs", type=int, default=120, help="number of node packs")
+    parser.add_argument("--idle", type=float, default=10.0, help="idle measurement window in seconds")
+    parser.add_argument("--changes", type=int, default=20, help="number of file changes for the latency measurement")
+    parser.add_argument("--backends", default="native,polling", help="comma separated backends to measure")
+    args = parser.parse_args()
+
+    print(f"building {args.files} files in {args.packs} packs under {CUSTOM_NODES_DIR} ...")
+    started = time.perf_counter()
+    sources = build_tree(args.packs, args.files)
+    print(f"  done in {time.perf_counter() - started:.1f}s")
+
+    hotreload = load_plugin()
+    # 插件加载时的服务不监听任何节点包；基准中新建的服务监听全部节点包
+    hotreload.HOTRELOAD_OBSERVE_ONLY.clear()
+    hotreload.HOT_RELOADER_SERVICE.stop()
+    baseline = measure_idle(min(args.idle, 3.0))
+    print(f"baseline idle CPU (plugin loaded, nothing watched): {baseline:.2f}%")
+
+    header = f"{'backend':<10}{'start (s)':>11}{'inotify':>9}{'watches':>9}{'idle CPU %':>12}{'p50 (ms)':>10}{'p95 (ms)':>10}{'max (ms)':>10}"
+    print(f"\n{header}")
+    for backend in [x.strip() for x in args.backends.split(",") if x.strip()]:
+        service = hotreload.HotReloaderService(delay=hotreload.DEBOUNCE_TIME, backend=backend)
+        started = time.perf_counter()
+        service.start()
+        start_time = time.perf_counter() - started
+        instances, watches = count_inotify()
+        # 等待新节点包的指纹预计算结束，避免计入空闲 CPU
+        while any(x.name == "HotReload.FingerprintPrimer" for x in threading.enumerate()):
+            time.sleep(0.1)
+        idle = max(0.0, measure_idle(args.idle) - baseline)
+        timeout = 5 * max(hotreload.POLLING_INTERVAL, 1.0)
+        latencies = sorted(measure_latency(service, sources, args.changes, timeout))
+        service.stop()
+        if latencies:
+            p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+            print(f"{service.backend:<10}{start_time:>11.2f}{instances:>9}{watches:>9}{idle:>12.2f}"
+                  f"{1000 * statistics.median(latencies):>10.1f}{1000 * p95:>10.1f}{1000 * latencies[-1]:>10.1f}")
+        else:
+            print(f"{service.backend:<10}{start_time:>11.2f}{instances:>9}{watches:>9}{idle:>12.2f}{'-':>10}{'-':>10}{'-':>10}")
+
+    hotreload.StopTerminalService()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+LG_HotReload 命令行：让正在运行的 ComfyUI 一次性重载多个节点包
+
+    python cli.py ComfyUI-Foo ComfyUI-Bar
+    python cli.py --since 10m
+    python cli.py --url http://127.0.0.1:8188 --since 1700000000
+
+只依赖标准库，可在部署脚本中直接调用；有节点包重载失败时退出码为 1。
+"""
+import argparse
+import json
+import sys
+import time
+import urllib.error
+import urllib.request
+
+
+UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_since(value: str) -> float:
+    """绝对时间戳，或 30s / 10m / 2h / 1d 这样的相对时间"""
+    value = value.strip()
+    if value and value[-1] in UNITS:
+        return time.time() - float(value[:-1]) * UNITS[value[-1]]
+    return float(value)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Reload ComfyUI custom node packs in one batch")
+    parser.add_argument("modules", nargs="*", help="node pack names under custom_nodes")
+    parser.add_argument("--since", help="reload every watched pack with .py files modified since this time (epoch or 30s/10m/2h/1d)")
+    parser.add_argument("--url", default="http://127.0.0.1:8188", help="ComfyUI server address (default: %(default)s)")
+    parser.add_argument("--timeout", type=float, default=600, help="request timeout in seconds (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    if bool(args.modules) == bool(args.since):
+        parser.error("pass either module names or --since")
+    try:
+        payload = {"since": parse_since(args.since)} if args.since else {"modules": args.modules}
+    except ValueError:
+        parser.error(f"invalid --since value: {args.since}")
+
+    request = urllib.request.Request(
+        args.url.rstrip("/") + "/hotreload/reload",
+        data=json.dumps(payload).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+        method="POST",
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=args.timeout) as response:
+            result = json.load(response)
+    except urllib.error.HTTPError as e:
+        try:
+            result = json.load(e)
+        except ValueError:
+            result = {"status": "error", "message": f"HTTP {e.code}"}
+    except (urllib.error.URLError, OSError) as e:
+        print(f"[LG_HotReload] Cannot reach {args.url}: {e}", file=sys.stderr)
+        return 2
+
+    results = result.get("results") or {}
+    if not results and result.get("status") != "error":
+        print("[LG_HotReload] Nothing to reload")
+    for module_name, status in results.items():
+        print(f"[LG_HotReload] {status:8} {module_name}")
+    if result.get("status") == "error":
+        if result.get("message"):
+            print(f"[LG_HotReload] {result['message']}" + (f": {', '.join(result['missing'])}" if result.get("missing") else ""), file=sys.stderr)
+        return 1
+    print(f"[LG_HotReload] {len(results)} packs reloaded in {result.get('duration', 0):.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+"""
+最小的 ComfyUI 替身（folder_paths / nodes / server / comfy_execution），供测试和 bench/ 中的脚本加载本插件
+
+只替换插件依赖的 ComfyUI 模块，watchdog、aiohttp 等第三方依赖需要正常安装。
+"""
+import importlib.util
+import os
+import sys
+import tempfile
+import types
+
+from aiohttp import web
+
+
+PLUGIN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WORK_DIR = tempfile.mkdtemp(prefix="hotreload_tests_")
+CUSTOM_NODES_DIR = os.path.join(WORK_DIR, "custom_nodes")
+USER_DIR = os.path.join(WORK_DIR, "user")
+
+
+NODES_SOURCE = '''
+import importlib.util
+import os
+import sys
+
+NODE_CLASS_MAPPINGS = {}
+NODE_DISPLAY_NAME_MAPPINGS = {}
+EXTENSION_WEB_DIRS = {}
+LOADED_MODULE_DIRS = {}
+
+
+async def load_custom_node(module_path, ignore=set(), module_parent="custom_nodes"):
+    # 以路径（单文件去掉扩展名，目录中的 "." 替换为 "_x_"）作为模块名执行节点包
+    module_name = os.path.basename(module_path)
+    if os.path.isfile(module_path):
+        sys_module_name = os.path.splitext(module_path)[0]
+        module_dir = os.path.split(module_path)[0]
+        spec = importlib.util.spec_from_file_location(sys_module_name, module_path)
+    else:
+        sys_module_name = module_path.replace(".", "_x_")
+        module_dir = module_path
+        spec = importlib.util.spec_from_file_location(
+            sys_module_name, os.path.join(module_path, "__init__.py"), submodule_search_locations=[module_path]
+        )
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[sys_module_name] = module
+    try:
+        spec.loader.exec_module(module)
+    except Exception:
+        sys.modules.pop(sys_module_name, None)
+        return False
+    LOADED_MODULE_DIRS[module_name] = os.path.abspath(module_dir)
+    if getattr(module, "WEB_DIRECTORY", None) is not None:
+        web_dir = os.path.abspath(os.path.join(module_dir, module.WEB_DIRECTORY))
+        if os.path.isdir(web_dir):
+            EXTENSION_WEB_DIRS[module_name] = web_dir
+    for name, node_cls in getattr(module, "NODE_CLASS_MAPPINGS", {}).items():
+        if name not in ignore:
+            NODE_CLASS_MAPPINGS[name] = node_cls
+    NODE_DISPLAY_NAME_MAPPINGS.update(getattr(module, "NODE_DISPLAY_NAME_MAPPINGS", {}))
+    return True
+'''
+
+
+def install_comfy_stubs():
+    folder_paths = types.ModuleType("folder_paths")
+    folder_paths.folder_names_and_paths = {"custom_nodes": ([CUSTOM_NODES_DIR], set())}
+    folder_paths.get_user_directory = lambda: USER_DIR
+
+    # 与 ComfyUI 的 nodes.py 相同，load_custom_node 通过模块全局变量写入注册表
+    nodes = types.ModuleType("nodes")
+    exec(compile(NODES_SOURCE, "nodes.py", "exec"), nodes.__dict__)
+
+    server = types.ModuleType("server")
+    class PromptServer:
+        instance = types.SimpleNamespace(routes=web.RouteTableDef(), app=None, loop=None, messages=[])
+    PromptServer.instance.send_sync = lambda event, data: PromptServer.instance.messages.append((event, data))
+
+    # 与 ComfyUI 的 server.py 相同：node_info 是 /object_info/{node_class} 处理函数闭包中的函数
+    def node_info(node_class):
+        obj_class = nodes.NODE_CLASS_MAPPINGS[node_class]
+        return {
+            "input": obj_class.INPUT_TYPES(),
+            "output": list(obj_class.RETURN_TYPES),
+            "name": node_class,
+            "display_name": nodes.NODE_DISPLAY_NAME_MAPPINGS.get(node_class, node_class),
+            "category": getattr(obj_class, "CATEGORY", "sd"),
+        }
+    @PromptServer.instance.routes.get("/object_info/{node_class}")
+    async def get_object_info_node(request):
+        node_class = request.match_info.get("node_class")
+        return web.json_response({node_class: node_info(node_class)})
+    server.PromptServer = PromptServer
+
+    comfy_execution = types.ModuleType("comfy_execution")
+    caching = types.ModuleType("comfy_execution.caching")
+    class BasicCache:
+        def set_prompt(self, dynprompt, node_ids, is_changed_cache):
+            pass
+    class HierarchicalCache(BasicCache):
+        pass
+    caching.BasicCache = BasicCache
+    caching.HierarchicalCache = HierarchicalCache
+    comfy_execution.caching = caching
+
+    sys.modules.update({
+        "folder_paths": folder_paths,
+        "nodes": nodes,
+        "server": server,
+        "comfy_execution": comfy_execution,
+        "comfy_execution.caching": caching,
+    })
+
+
+def load_plugin(**env):
+    """
+    在替身环境中加载插件本身，返回插件模块
+
+    默认不写重载日志、不预检、不监听任何节点包，env 中的 HOTRELOAD_* 设置会覆盖默认值。
+    """
+    os.makedirs(CUSTOM_NODES_DIR, exist_ok=True)
+    os.makedirs(USER_DIR, exist_ok=True)
+    os.environ.update({
+        "HOTRELOAD_JOURNAL": "0",
+        "HOTRELOAD_PREFLIGHT": "0",
+        "HOTRELOAD_GC": "0",
+        "HOTRELOAD_OBSERVE_ONLY": "-",
+        **env,
+    })
+    install_comfy_stubs()
+    spec = importlib.util.spec_from_file_location(
+        "LG_HotReload", os.path.join(PLUGIN_DIR, "__init__.py"), submodule_search_locations=[PLUGIN_DIR]
+    )
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
@@ -0,0 +1,35 @@
+import os
+
+import pytest
+
+from comfy_stubs import CUSTOM_NODES_DIR, load_plugin
+
+
+@pytest.fixture(scope="session")
+def hotreload():
+    """加载插件本身（不写重载日志、不预检、不监听任何节点包）"""
+    module = load_plugin()
+    yield module
+    module.HOT_RELOADER_SERVICE.stop()
+    module.StopTerminalService()
+
+
+@pytest.fixture
+def make_pack():
+    """在测试用的 custom_nodes 下写入节点包，返回其路径"""
+    def make(name: str, files: dict[str, str]) -> str:
+        pack_dir = os.path.join(CUSTOM_NODES_DIR, name)
+        for relative_path, content in files.items():
+            write_file(os.path.join(pack_dir, relative_path), content)
+        return pack_dir
+    return make
+
+
+def write_file(file_path: str, content: str):
+    """写入文件并把 mtime 推后，保证 (mtime_ns, size) 一定变化"""
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    previous = os.stat(file_path).st_mtime_ns if os.path.exists(file_path) else 0
+    with open(file_path, "w", encoding="utf-8") as f:
+        f.write(content)
+    mtime = max(os.stat(file_path).st_mtime_ns, previous + 1_000_000_000)
+    os.utime(file_path, ns=(mtime, mtime))
@@ -0,0 +1,33 @@
+async def get_item(request):
+    return "get_item"
+
+
+async def post_static(request):
+    return "post_static"
+
+
+async def get_file(request):
+    return "get_file"
+
+
+def test_static_path_without_method_falls_back_to_params(hotreload):
+    table = hotreload.DynamicRouteTable()
+    table.add("POST", "/a/static", post_static)
+    table.add("GET", "/a/{id}", get_item)
+
+    # aiohttp 会继续尝试 /a/{id}，而不是直接返回 405
+    assert table.resolve("GET", "/a/static") == (get_item, {"id": "static"}, {"GET", "POST"})
+    assert table.resolve("POST", "/a/static") == (post_static, {}, {"POST"})
+    assert table.resolve("PUT", "/a/static") == (None, {}, {"GET", "POST"})
+    assert table.resolve("PUT", "/a/other") == (None, {}, {"GET"})
+    assert table.resolve("GET", "/b/static") == (None, {}, None)
+
+
+def test_param_route_without_method_falls_back_to_tail(hotreload):
+    table = hotreload.DynamicRouteTable()
+    table.add("POST", "/files/{name}", post_static)
+    table.add("GET", "/files/{path:.*}", get_file)
+
+    assert table.resolve("GET", "/files/x.png") == (get_file, {"path": "x.png"}, {"GET", "POST"})
+    assert table.resolve("HEAD", "/files/a/b.png") == (get_file, {"path": "a/b.png"}, {"GET"})
+    assert table.resolve("DELETE", "/files/x.png") == (None, {}, {"GET", "POST"})
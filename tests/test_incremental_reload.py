@@ -0,0 +1,94 @@
+import os
+import sys
+
+from conftest import write_file
+
+
+NODE_TEMPLATE = '''
+class {name}:
+    VERSION = {version}
+    FUNCTION = "run"
+    RETURN_TYPES = ()
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {{"required": {{}}}}
+    def run(self):
+        return ()
+'''
+
+FIXTURE_PACK = {
+    "__init__.py": (
+        "from .nodes_a import NodeA\n"
+        "from .nodes_b import NodeB\n"
+        "NODE_CLASS_MAPPINGS = {'NodeA': NodeA, 'NodeB': NodeB}\n"
+    ),
+    "util.py": "VALUE = 1\n",
+    "nodes_a.py": NODE_TEMPLATE.format(name="NodeA", version=1),
+    "nodes_b.py": "from .util import VALUE\n" + NODE_TEMPLATE.format(name="NodeB", version=1),
+}
+
+
+def pack_modules(pack_dir: str) -> dict:
+    """节点包内已加载的模块，按文件名索引"""
+    prefix = os.path.join(pack_dir, "")
+    return {
+        os.path.basename(module.__file__): module
+        for module in list(sys.modules.values())
+        if getattr(module, "__file__", None) and module.__file__.startswith(prefix)
+    }
+
+
+def load_pack(hotreload, name: str, make_pack) -> str:
+    pack_dir = make_pack(name, FIXTURE_PACK)
+    assert hotreload.HOT_RELOADER_SERVICE.reload_modules({name: None}) == {name: "ok"}
+    return pack_dir
+
+
+def test_untouched_modules_keep_identity(hotreload, make_pack):
+    import nodes
+    pack_dir = load_pack(hotreload, "identity_pack", make_pack)
+    before = pack_modules(pack_dir)
+    node_a = nodes.NODE_CLASS_MAPPINGS["NodeA"]
+
+    changed = os.path.join(pack_dir, "nodes_b.py")
+    write_file(changed, "from .util import VALUE\n" + NODE_TEMPLATE.format(name="NodeB", version=2))
+    assert hotreload.HOT_RELOADER_SERVICE.reload_modules({"identity_pack": {changed}}) == {"identity_pack": "ok"}
+
+    after = pack_modules(pack_dir)
+    assert after["util.py"] is before["util.py"]
+    assert after["nodes_a.py"] is before["nodes_a.py"]
+    assert after["nodes_b.py"] is not before["nodes_b.py"]
+    assert after["__init__.py"] is not before["__init__.py"]
+    assert nodes.NODE_CLASS_MAPPINGS["NodeA"] is node_a
+    assert nodes.NODE_CLASS_MAPPINGS["NodeB"].VERSION == 2
+
+
+def test_dependents_of_changed_module_are_reloaded(hotreload, make_pack):
+    pack_dir = load_pack(hotreload, "dependents_pack", make_pack)
+    before = pack_modules(pack_dir)
+
+    changed = os.path.join(pack_dir, "util.py")
+    write_file(changed, "VALUE = 2\n")
+    assert hotreload.HOT_RELOADER_SERVICE.reload_modules({"dependents_pack": {changed}}) == {"dependents_pack": "ok"}
+
+    after = pack_modules(pack_dir)
+    assert after["nodes_a.py"] is before["nodes_a.py"]
+    for file_name in ("util.py", "nodes_b.py", "__init__.py"):
+        assert after[file_name] is not before[file_name]
+    assert after["nodes_b.py"].VALUE == 2
+
+
+def test_dependency_scan_does_not_consume_pending_changes(hotreload, make_pack):
+    # 两个文件同时被修改、只处理了其中一个的事件时，依赖分析不能让另一个的事件被判定为"未变化"
+    pack_dir = make_pack("pending_pack", FIXTURE_PACK)
+    file_a = os.path.join(pack_dir, "nodes_a.py")
+    file_b = os.path.join(pack_dir, "nodes_b.py")
+    hotreload.prime_fingerprints(["pending_pack"])
+
+    write_file(file_a, NODE_TEMPLATE.format(name="NodeA", version=2))
+    write_file(file_b, "from .util import VALUE\n" + NODE_TEMPLATE.format(name="NodeB", version=2))
+    assert hotreload.FILE_FINGERPRINTS.check(file_a) == "modified"
+    affected = hotreload.MODULE_DEPENDENCIES.affected_files(pack_dir, {file_a})
+
+    assert hotreload.normalize_path(file_b) not in affected
+    assert hotreload.FILE_FINGERPRINTS.check(file_b) == "modified"
@@ -0,0 +1,40 @@
+import asyncio
+import json
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+
+
+def post_reload(hotreload, body: str):
+    async def run():
+        app = web.Application()
+        app.router.add_post("/hotreload/reload", hotreload.reload_modules_on_demand)
+        async with TestClient(TestServer(app)) as client:
+            response = await client.post("/hotreload/reload", data=body, headers={"Content-Type": "application/json"})
+            return response.status, await response.json()
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize("body", [
+    "not json",
+    "[1, 2]",
+    "null",
+    '{"modules": "pack"}',
+    '{"modules": [1]}',
+    '{"since": "soon"}',
+    '{"since": [1]}',
+    '{"since": true}',
+    '{"since": "nan"}',
+])
+def test_invalid_reload_requests_are_rejected(hotreload, body):
+    status, result = post_reload(hotreload, body)
+    assert status == 400
+    assert result["status"] == "error"
+
+
+def test_reload_since_accepts_numeric_timestamps(hotreload):
+    # 未来的时间点：没有需要重载的节点包
+    status, result = post_reload(hotreload, json.dumps({"since": "4000000000"}))
+    assert status == 200
+    assert result["results"] == {}
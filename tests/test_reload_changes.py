@@ -0,0 +1,26 @@
+import asyncio
+
+from conftest import write_file
+from test_incremental_reload import NODE_TEMPLATE
+
+
+def last_changes(hotreload) -> dict:
+    messages = hotreload.PromptServer.instance.messages
+    return [data for event, data in messages if event == "hot_reload_update"][-1]["changes"]
+
+
+def test_first_reload_of_startup_pack_diffs_against_loaded_classes(hotreload, make_pack):
+    import nodes
+    pack_dir = make_pack("startup_pack", {
+        "__init__.py": NODE_TEMPLATE.format(name="StartupNode", version=1) + "NODE_CLASS_MAPPINGS = {'StartupNode': StartupNode}\n",
+    })
+    # ComfyUI 启动时加载：只以基于路径的名字注册在 sys.modules 中
+    assert asyncio.run(nodes.load_custom_node(pack_dir))
+    assert "startup_pack" not in hotreload.sys.modules
+
+    # 只改实现，首次重载就应识别为 implementation，而不是新增节点
+    write_file(f"{pack_dir}/__init__.py", NODE_TEMPLATE.format(name="StartupNode", version=2) + "NODE_CLASS_MAPPINGS = {'StartupNode': StartupNode}\n")
+    assert hotreload.HOT_RELOADER_SERVICE.reload_modules({"startup_pack": None}) == {"startup_pack": "ok"}
+    changes = last_changes(hotreload)
+    assert changes["added"] == []
+    assert changes["implementation"] == ["StartupNode"]
@@ -0,0 +1,24 @@
+from test_incremental_reload import NODE_TEMPLATE
+
+
+def test_staging_does_not_swap_the_live_registries(hotreload, make_pack):
+    import nodes
+    live = {name: getattr(nodes, name) for name in hotreload.ShadowNodeRegistries.REGISTRIES}
+    make_pack("staged_pack", {
+        "__init__.py": (
+            "import nodes\n"
+            # 导入期间（暂存阶段）其他线程看到的注册表
+            "SEEN_DURING_STAGING = nodes.NODE_CLASS_MAPPINGS\n"
+            "SEEN_NEW_NODE = 'StagedNode' in nodes.NODE_CLASS_MAPPINGS\n"
+            + NODE_TEMPLATE.format(name="StagedNode", version=1)
+            + "NODE_CLASS_MAPPINGS = {'StagedNode': StagedNode}\n"
+        ),
+    })
+    assert hotreload.HOT_RELOADER_SERVICE.reload_modules({"staged_pack": None}) == {"staged_pack": "ok"}
+
+    module = hotreload.loaded_pack_module("staged_pack")
+    assert module.SEEN_DURING_STAGING is live["NODE_CLASS_MAPPINGS"]
+    assert not module.SEEN_NEW_NODE
+    assert all(getattr(nodes, name) is registry for name, registry in live.items())
+    # 切换阶段写入真实注册表
+    assert nodes.NODE_CLASS_MAPPINGS["StagedNode"] is module.StagedNode
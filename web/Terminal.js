@@ -1,10 +1,13 @@
 import { app } from "../../scripts/app.js"
+import { api } from "../../scripts/api.js"
 import { Util } from "./Util.js"
 
 
 // Terminal
 var TerminalTextVersion = 0
 var TerminalLines = new Array()
+var TerminalLastSeq = 0
+var TerminalEpoch = null
 
 
 // Register Extension
@@ -16,15 +19,48 @@ app.registerExtension({
     async setup() {
         // Terminal
         Util.AddMessageListener("/hotreload.terminal.log", logTerminal)
+        api.addEventListener("reconnected", fetchMissing)
+        fetchMissing()
         function logTerminal(event) {
+            const batch = event.detail
+            syncEpoch(batch)
+            // Missed batches (e.g. while disconnected): request everything after the last seen line
+            if (batch.first_seq !== undefined && !batch.clear && batch.first_seq > TerminalLastSeq + 1) {
+                fetchMissing()
+                return
+            }
+            applyBatch(batch)
+        }
+        async function fetchMissing() {
+            try {
+                const response = await api.fetchApi(`/hotreload/terminal/log?since=${TerminalLastSeq}`)
+                applyBatch(await response.json())
+            } catch (error) {
+                console.warn("[HotReload] Failed to fetch missed terminal lines:", error)
+            }
+        }
+        // Sequence numbers restart with the server (or a recreated log pipeline): forget the last seen one
+        function syncEpoch(batch) {
+            if (batch.epoch == null || batch.epoch === TerminalEpoch) return
+            if (TerminalEpoch !== null) TerminalLastSeq = 0
+            TerminalEpoch = batch.epoch
+        }
+        function applyBatch(batch) {
+            syncEpoch(batch)
             TerminalTextVersion++
             // Check for Clear
-            if (event.detail.clear) {
+            if (batch.clear) {
                 TerminalLines.length = 0
+                TerminalLastSeq = 0
+            }
+            // Push Line (skip lines already received)
+            let lines = String(batch.text || "").split("\n")
+            if (batch.first_seq !== undefined) {
+                if (batch.text === "") lines = []
+                lines = lines.slice(Math.max(0, TerminalLastSeq + 1 - batch.first_seq))
+                TerminalLastSeq = Math.max(TerminalLastSeq, batch.seq)
             }
-            // Push Line
-            let totalText = String(event.detail.text || "")
-            TerminalLines.push(...(totalText.split("\n")))
+            TerminalLines.push(...lines)
             if (TerminalLines.length > 1024) {
                 TerminalLines = TerminalLines.slice(TerminalLines.length - 1024, TerminalLines.length)
             }
@@ -11,116 +11,54 @@ app.registerExtension({
             const nodesToUpdate = [...changes.added, ...changes.updated];
             if (nodesToUpdate.length > 0) {
                 try {
+                    // 节点定义优先使用消息中携带的，缺失的通过批量接口一次取回
+                    const definitions = await fetchNodeDefinitions(nodesToUpdate, message.definitions || {});
+
+                    // 一次遍历建立 类型 -> 节点 的映射
+                    const updateTypes = new Set(nodesToUpdate);
+                    const nodesByType = new Map();
+                    for (const node of app.graph._nodes || app.graph.nodes || []) {
+                        if (!updateTypes.has(node.type)) continue;
+                        if (!nodesByType.has(node.type)) nodesByType.set(node.type, []);
+                        nodesByType.get(node.type).push(node);
+                    }
+
                     const savedStates = new Map();
-                    for (const nodeClass of nodesToUpdate) {
-                        const existingNodes = app.graph.findNodesByType(nodeClass);
+                    for (const existingNodes of nodesByType.values()) {
                         existingNodes.forEach(node => {
                             try {
-                                const widgetStates = {};
-                                if (node.widgets) {
-                                    for (const w of node.widgets) {
-                                        try {
-                                            if (w && w.name) {
-                                                if (w.value === undefined || w.value === null) {
-                                                    widgetStates[w.name] = w.value;
-                                                    continue;
-                                                }
-                                                
-                                                widgetStates[w.name] = w.serializeValue ? 
-                                                    (typeof w.serializeValue === 'function' ? 
-                                                        (function() {
-                                                            try {
-                                                                return w.serializeValue();
-                                                            } catch {
-                                                                return w.value;
-                                                            }
-                                                        })() 
-                                                        : w.value) 
-                                                    : w.value;
-                                            }
-                                        } catch (widgetError) {
-                                            console.warn(`[HotReload] Failed to serialize widget ${w?.name}, using original value:`, widgetError);
-                                            widgetStates[w.name] = w.value;
-                                        }
-                                    }
-                                }
-                                
-                                savedStates.set(node.id, {
-                                    id: node.id,
-                                    pos: [...node.pos],
-                                    size: [...node.size],
-                                    widgets: widgetStates,
-                                    properties: {...node.properties}
-                                });
+                                savedStates.set(node.id, saveNodeState(node));
                             } catch (nodeError) {
                                 console.error(`[HotReload] Failed to save node state:`, nodeError);
                             }
                         });
                     }
-                    
+
                     // 更新节点定义
-                    for (const nodeClass of nodesToUpdate) {
+                    await Promise.all(Object.entries(definitions).map(async ([nodeClass, nodeDef]) => {
                         try {
-                            const response = await api.fetchApi(`/object_info/${nodeClass}`);
-                            
-                            if (!response.ok) {
-                                console.error(`[HotReload] 获取节点数据失败: ${nodeClass}, 状态码: ${response.status}`);
-                                const text = await response.text();
-                                console.error(`[HotReload] 错误详情:`, text);
-                                continue;
-                            }
-
-                            const nodeData = await response.json();
-                            
-                            if (nodeData && nodeData[nodeClass]) {
-                                app.registerNodeDef(nodeClass, nodeData[nodeClass]);
-                                const existingNodes = app.graph.findNodesByType(nodeClass);
-                                existingNodes.forEach(node => {
-                                    if (node.widgets) {
-                                        node.widgets.forEach(widget => {
-                                            if (widget.type === "combo" &&
-                                                nodeData[nodeClass]["input"]["required"][widget.name]) {
-                                                widget.options.values = nodeData[nodeClass]["input"]["required"][widget.name][0];
-                                            }
-                                        });
-                                    }
-                                    node.refreshComboInNode?.(nodeData);
-                                });
-                            } else {
-                                console.error(`[HotReload] 节点数据格式错误:`, nodeData);
+                            await app.registerNodeDef(nodeClass, nodeDef);
+                            const required = nodeDef?.input?.required || {};
+                            for (const node of nodesByType.get(nodeClass) || []) {
+                                if (node.widgets) {
+                                    node.widgets.forEach(widget => {
+                                        if (widget.type === "combo" && required[widget.name]) {
+                                            widget.options.values = required[widget.name][0];
+                                        }
+                                    });
+                                }
+                                node.refreshComboInNode?.(definitions);
                             }
                         } catch (error) {
                             console.error(`[HotReload] 处理节点更新时出错: ${nodeClass}`, error);
                         }
-                    }
+                    }));
 
                     // 恢复节点状态，但不处理连接
                     for (const state of savedStates.values()) {
                         const node = app.graph.getNodeById(state.id);
                         if (node) {
-                            node.pos = state.pos;
-                            node.size = state.size;
-                            Object.assign(node.properties, state.properties);
-                            if (node.widgets) {
-                                for (const w of node.widgets) {
-                                    if (state.widgets[w.name] !== undefined) {
-                                        try {
-                                            if (w.loadValue) {
-                                                await w.loadValue(state.widgets[w.name]);
-                                            } else {
-                                                const value = state.widgets[w.name];
-                                                if (value instanceof Promise) {
-                                                    w.value = await value;
-                                                } else {
-                                                    w.value = value;
-                                                }
-                                            }
-                                        } catch (error) {
-                                            console.warn(`[HotReload] Failed to restore widget value for ${w.name}:`, error);
-                                        }
-                                    }
-                                }
-                            }
+                            await restoreNodeState(node, state);
                         }
                     }
                     app.graph.setDirtyCanvas(true);
@@ -130,8 +68,182 @@ app.registerExtension({
                 }
             }
         });
+
+        // 预检失败：重载被拒绝，正在运行的版本保持不变
+        api.addEventListener("hot_reload_error", (event) => {
+            const message = event.detail;
+            console.error("[HotReload] Reload rejected:", message);
+            const detail = (message.errors || []).map(error => {
+                const location = error.file ? `${error.file}${error.line ? `:${error.line}` : ""}` : message.module;
+                return `${error.type}: ${error.message}\n${location}${error.text ? `\n    ${error.text}` : ""}`;
+            }).join("\n\n");
+            const toast = app.extensionManager?.toast;
+            if (toast?.add) {
+                toast.add({
+                    severity: "error",
+                    summary: `[HotReload] ${message.module}`,
+                    detail,
+                    life: 8000
+                });
+            }
+        });
+
+        // 前端资源（WEB_DIRECTORY 中的 js/css）变更：只重新加载变化的文件，不刷新页面
+        api.addEventListener("hot_reload_web_update", async (event) => {
+            const message = event.detail;
+            console.log("[HotReload] Web asset changed:", message);
+            if (message.action === "deleted" || !message.version) return;
+            try {
+                if (message.kind === "css") {
+                    reloadStylesheet(message.url, message.version);
+                } else if (message.kind === "js") {
+                    await reloadExtensionScript(message.url, message.version);
+                }
+            } catch (error) {
+                console.error(`[HotReload] 重新加载前端资源失败: ${message.url}`, error);
+            }
+        });
     }
 });
+
+function versionedUrl(url, version) {
+    return api.fileURL ? api.fileURL(`${url}?v=${version}`) : `${url}?v=${version}`;
+}
+
+// 更新 link 标签的 href，浏览器只重新请求这一个样式表
+function reloadStylesheet(url, version) {
+    let found = false;
+    document.querySelectorAll('link[rel="stylesheet"]').forEach(link => {
+        if (new URL(link.href, location.href).pathname.endsWith(url)) {
+            link.href = versionedUrl(url, version);
+            found = true;
+        }
+    });
+    if (!found) {
+        const link = document.createElement("link");
+        link.rel = "stylesheet";
+        link.href = versionedUrl(url, version);
+        document.head.appendChild(link);
+    }
+}
+
+// 以新的版本号重新 import 脚本；脚本中再次调用 registerExtension 时替换同名扩展而不是报错
+async function reloadExtensionScript(url, version) {
+    const originalRegister = app.registerExtension;
+    app.registerExtension = function (extension) {
+        const existing = (app.extensions || []).find(ext => ext.name === extension.name);
+        if (!existing) {
+            return originalRegister.call(this, extension);
+        }
+        // 原地替换钩子，之后的 beforeRegisterNodeDef/nodeCreated 等调用使用新代码
+        for (const key of Object.keys(existing)) {
+            if (key !== "name") delete existing[key];
+        }
+        Object.assign(existing, extension);
+        Promise.resolve()
+            .then(() => existing.init?.(app))
+            .then(() => existing.setup?.(app))
+            .catch(error => console.error(`[HotReload] 扩展 ${extension.name} 初始化失败:`, error));
+    };
+    try {
+        await import(versionedUrl(url, version));
+        console.log(`[HotReload] Reloaded ${url}`);
+    } finally {
+        app.registerExtension = originalRegister;
+    }
+}
+
+// 取回节点定义：已有的直接使用，缺失的走批量接口，批量接口不可用时并发请求 /object_info
+async function fetchNodeDefinitions(nodeClasses, definitions) {
+    const result = { ...definitions };
+    let missing = nodeClasses.filter(nodeClass => !result[nodeClass]);
+    if (missing.length === 0) return result;
+    try {
+        const response = await api.fetchApi('/hotreload/object_info', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ classes: missing })
+        });
+        if (response.ok) {
+            Object.assign(result, await response.json());
+            missing = missing.filter(nodeClass => !result[nodeClass]);
+        }
+    } catch (error) {
+        console.warn('[HotReload] 批量获取节点数据失败，改为逐个获取:', error);
+    }
+    await Promise.all(missing.map(async nodeClass => {
+        try {
+            const response = await api.fetchApi(`/object_info/${nodeClass}`);
+            if (!response.ok) {
+                console.error(`[HotReload] 获取节点数据失败: ${nodeClass}, 状态码: ${response.status}`);
+                console.error(`[HotReload] 错误详情:`, await response.text());
+                return;
+            }
+            const nodeData = await response.json();
+            if (nodeData && nodeData[nodeClass]) {
+                result[nodeClass] = nodeData[nodeClass];
+            } else {
+                console.error(`[HotReload] 节点数据格式错误:`, nodeData);
+            }
+        } catch (error) {
+            console.error(`[HotReload] 处理节点更新时出错: ${nodeClass}`, error);
+        }
+    }));
+    return result;
+}
+
+function serializeWidgetValue(w) {
+    if (w.value === undefined || w.value === null || typeof w.serializeValue !== 'function') {
+        return w.value;
+    }
+    try {
+        return w.serializeValue();
+    } catch {
+        return w.value;
+    }
+}
+
+function saveNodeState(node) {
+    const widgetStates = {};
+    if (node.widgets) {
+        for (const w of node.widgets) {
+            if (!w || !w.name) continue;
+            try {
+                widgetStates[w.name] = serializeWidgetValue(w);
+            } catch (widgetError) {
+                console.warn(`[HotReload] Failed to serialize widget ${w?.name}, using original value:`, widgetError);
+                widgetStates[w.name] = w.value;
+            }
+        }
+    }
+    return {
+        id: node.id,
+        pos: [...node.pos],
+        size: [...node.size],
+        widgets: widgetStates,
+        properties: {...node.properties}
+    };
+}
+
+async function restoreNodeState(node, state) {
+    node.pos = state.pos;
+    node.size = state.size;
+    Object.assign(node.properties, state.properties);
+    if (!node.widgets) return;
+    for (const w of node.widgets) {
+        if (state.widgets[w.name] === undefined) continue;
+        try {
+            if (w.loadValue) {
+                await w.loadValue(state.widgets[w.name]);
+            } else {
+                const value = state.widgets[w.name];
+                w.value = value instanceof Promise ? await value : value;
+            }
+        } catch (error) {
+            console.warn(`[HotReload] Failed to restore widget value for ${w.name}:`, error);
+        }
+    }
+}
 app.registerExtension({
     name: "ComfyUI.HotReload",
     async setup() {
@@ -157,7 +269,19 @@ app.registerExtension({
                 "Enter module name": "输入模块名称",
                 "Add": "添加",
                 "Add All Modules": "添加所有模块",
-                "Close": "关闭"
+                "Close": "关闭",
+                "Import Profiles": "导入耗时分析",
+                "Profile imports on reload": "重载时分析导入耗时",
+                "No import profiles yet. Enable profiling and save a file in a node pack.":
+                    "暂无分析结果。开启导入耗时分析后，修改节点包中的文件即可生成。",
+                "Slowest imports": "最慢的导入",
+                "Import tree": "导入树",
+                "Clear": "清空",
+                "Back": "返回",
+                "Reload History": "重载记录",
+                "No reloads recorded yet.": "暂无重载记录。",
+                "Succeeded": "成功",
+                "Failed": "失败"
             }
         };
 
@@ -591,11 +715,21 @@ app.registerExtension({
                     console.error('获取所有模块失败:', error);
                 }
             };
+            const profilesBtn = document.createElement("button");
+            profilesBtn.textContent = t("Import Profiles");
+            profilesBtn.className = "comfy-btn";
+            profilesBtn.style.padding = "8px 20px";
             const closeBtn = document.createElement("button");
             closeBtn.textContent = t("Close");
             closeBtn.className = "comfy-btn";
             closeBtn.style.padding = "8px 20px";
+            const historyBtn = document.createElement("button");
+            historyBtn.textContent = t("Reload History");
+            historyBtn.className = "comfy-btn";
+            historyBtn.style.padding = "8px 20px";
             buttonsContainer.appendChild(addAllBtn);
+            buttonsContainer.appendChild(profilesBtn);
+            buttonsContainer.appendChild(historyBtn);
             buttonsContainer.appendChild(closeBtn);
             dialog.appendChild(buttonsContainer);
             closeBtn.onclick = () => {
@@ -604,6 +738,14 @@ app.registerExtension({
                     document.body.removeChild(document.getElementById('hotreload-dialog-overlay'));
                 }
             };
+            profilesBtn.onclick = () => {
+                closeBtn.onclick();
+                showImportProfilesDialog();
+            };
+            historyBtn.onclick = () => {
+                closeBtn.onclick();
+                showReloadHistoryDialog();
+            };
             const overlay = document.createElement("div");
             overlay.id = "hotreload-dialog-overlay";
             overlay.style.position = "fixed";
@@ -617,5 +759,260 @@ app.registerExtension({
             document.body.appendChild(dialog);
             input.focus();
         }
+
+        // 子对话框共用的骨架：标题、列表区、底部按钮（返回 / 关闭）与遮罩
+        function createDialog(titleText) {
+            const dialog = document.createElement("div");
+            dialog.className = "hotreload-dialog";
+            dialog.style.position = "fixed";
+            dialog.style.top = "50%";
+            dialog.style.left = "50%";
+            dialog.style.transform = "translate(-50%, -50%)";
+            dialog.style.backgroundColor = "#1a1a1a";
+            dialog.style.border = "1px solid #444";
+            dialog.style.borderRadius = "8px";
+            dialog.style.padding = "20px";
+            dialog.style.zIndex = "10000";
+            dialog.style.minWidth = "400px";
+            dialog.style.maxWidth = "700px";
+            dialog.style.boxShadow = "0 4px 23px 0 rgba(0, 0, 0, 0.2)";
+            const title = document.createElement("h2");
+            title.textContent = titleText;
+            title.style.margin = "0 0 20px 0";
+            title.style.borderBottom = "1px solid #444";
+            title.style.paddingBottom = "10px";
+            dialog.appendChild(title);
+
+            const listContainer = document.createElement("div");
+            listContainer.style.maxHeight = "400px";
+            listContainer.style.overflowY = "auto";
+            listContainer.style.marginBottom = "20px";
+            listContainer.style.border = "1px solid #333";
+            listContainer.style.borderRadius = "4px";
+            listContainer.style.padding = "5px";
+            dialog.appendChild(listContainer);
+
+            const buttonsContainer = document.createElement("div");
+            buttonsContainer.style.display = "flex";
+            buttonsContainer.style.justifyContent = "space-between";
+            buttonsContainer.style.marginTop = "20px";
+            const backBtn = document.createElement("button");
+            backBtn.textContent = t("Back");
+            backBtn.className = "comfy-btn";
+            backBtn.style.padding = "8px 20px";
+            const closeBtn = document.createElement("button");
+            closeBtn.textContent = t("Close");
+            closeBtn.className = "comfy-btn";
+            closeBtn.style.padding = "8px 20px";
+            buttonsContainer.appendChild(backBtn);
+            buttonsContainer.appendChild(closeBtn);
+            dialog.appendChild(buttonsContainer);
+
+            const overlay = document.createElement("div");
+            overlay.id = "hotreload-dialog-overlay";
+            overlay.style.position = "fixed";
+            overlay.style.top = "0";
+            overlay.style.left = "0";
+            overlay.style.width = "100%";
+            overlay.style.height = "100%";
+            overlay.style.backgroundColor = "rgba(0, 0, 0, 0.5)";
+            overlay.style.zIndex = "9999";
+
+            const close = () => {
+                document.body.removeChild(dialog);
+                if (document.getElementById('hotreload-dialog-overlay')) {
+                    document.body.removeChild(document.getElementById('hotreload-dialog-overlay'));
+                }
+            };
+            closeBtn.onclick = close;
+            backBtn.onclick = () => {
+                close();
+                showHotReloadDialog();
+            };
+            return {
+                dialog,
+                listContainer,
+                // 额外的按钮排在“返回”之前
+                addButton(label, onclick) {
+                    const button = document.createElement("button");
+                    button.textContent = label;
+                    button.className = "comfy-btn";
+                    button.style.padding = "8px 20px";
+                    button.onclick = onclick;
+                    buttonsContainer.insertBefore(button, backBtn);
+                    return button;
+                },
+                show() {
+                    document.body.appendChild(overlay);
+                    document.body.appendChild(dialog);
+                },
+            };
+        }
+
+        // 导入耗时分析结果
+        async function showImportProfilesDialog() {
+            let data = { enabled: false, profiles: [] };
+            try {
+                const response = await api.fetchApi('/hotreload/profiles');
+                data = await response.json();
+            } catch (error) {
+                console.error('获取导入耗时分析失败:', error);
+            }
+
+            const formatMs = (seconds) => `${(seconds * 1000).toFixed(1)} ms`;
+
+            const { dialog, listContainer, addButton, show } = createDialog(t("Import Profiles"));
+
+            // 开关
+            const toggleLabel = document.createElement("label");
+            toggleLabel.style.display = "flex";
+            toggleLabel.style.alignItems = "center";
+            toggleLabel.style.gap = "8px";
+            toggleLabel.style.marginBottom = "15px";
+            toggleLabel.style.color = "#aaa";
+            const toggle = document.createElement("input");
+            toggle.type = "checkbox";
+            toggle.checked = !!data.enabled;
+            toggle.onchange = async () => {
+                try {
+                    await api.fetchApi('/hotreload/profiles', {
+                        method: 'POST',
+                        headers: { 'Content-Type': 'application/json' },
+                        body: JSON.stringify({ enabled: toggle.checked })
+                    });
+                } catch (error) {
+                    console.error('更新导入耗时分析设置失败:', error);
+                }
+            };
+            toggleLabel.appendChild(toggle);
+            toggleLabel.appendChild(document.createTextNode(t("Profile imports on reload")));
+            dialog.insertBefore(toggleLabel, listContainer);
+
+            function renderTree(node, depth = 0) {
+                const item = document.createElement(node.children.length ? "details" : "div");
+                const summary = document.createElement(node.children.length ? "summary" : "div");
+                summary.textContent = `${node.module}  ${formatMs(node.cumulative)} (${formatMs(node.self)})`;
+                summary.style.color = node.local ? "#eee" : "#888";
+                summary.style.paddingLeft = node.children.length ? "0" : "14px";
+                item.appendChild(summary);
+                item.style.marginLeft = depth ? "14px" : "0";
+                item.style.fontFamily = "monospace";
+                item.style.fontSize = "12px";
+                [...node.children]
+                    .sort((a, b) => b.cumulative - a.cumulative)
+                    .forEach(child => item.appendChild(renderTree(child, depth + 1)));
+                return item;
+            }
+
+            function renderProfiles(profiles) {
+                listContainer.innerHTML = '';
+                if (!profiles.length) {
+                    const empty = document.createElement("div");
+                    empty.textContent = t("No import profiles yet. Enable profiling and save a file in a node pack.");
+                    empty.style.padding = "10px";
+                    empty.style.color = "#666";
+                    empty.style.textAlign = "center";
+                    listContainer.appendChild(empty);
+                    return;
+                }
+                profiles.forEach(profile => {
+                    const section = document.createElement("details");
+                    section.style.padding = "8px";
+                    section.style.borderBottom = "1px solid #333";
+                    const summary = document.createElement("summary");
+                    summary.textContent = `${profile.module} — ${formatMs(profile.duration)} — ${new Date(profile.timestamp * 1000).toLocaleTimeString()}`;
+                    summary.style.cursor = "pointer";
+                    section.appendChild(summary);
+
+                    const topTitle = document.createElement("div");
+                    topTitle.textContent = t("Slowest imports");
+                    topTitle.style.margin = "8px 0 4px 0";
+                    topTitle.style.color = "#aaa";
+                    section.appendChild(topTitle);
+                    profile.top.forEach(entry => {
+                        const row = document.createElement("div");
+                        row.textContent = `${formatMs(entry.self)}  ${entry.module}`;
+                        row.style.fontFamily = "monospace";
+                        row.style.fontSize = "12px";
+                        row.style.color = entry.local ? "#eee" : "#888";
+                        section.appendChild(row);
+                    });
+
+                    const treeTitle = document.createElement("div");
+                    treeTitle.textContent = t("Import tree");
+                    treeTitle.style.margin = "8px 0 4px 0";
+                    treeTitle.style.color = "#aaa";
+                    section.appendChild(treeTitle);
+                    section.appendChild(renderTree(profile.tree));
+                    listContainer.appendChild(section);
+                });
+            }
+            renderProfiles(data.profiles || []);
+
+            addButton(t("Clear"), async () => {
+                try {
+                    await api.fetchApi('/hotreload/profiles', {
+                        method: 'POST',
+                        headers: { 'Content-Type': 'application/json' },
+                        body: JSON.stringify({ clear: true })
+                    });
+                    renderProfiles([]);
+                } catch (error) {
+                    console.error('清空导入耗时分析失败:', error);
+                }
+            });
+            show();
+        }
+
+        // 重载记录（来自服务端的持久化重载日志，重启后仍保留）
+        async function showReloadHistoryDialog() {
+            let history = [];
+            try {
+                const response = await api.fetchApi('/hotreload/history?limit=200');
+                history = (await response.json()).history || [];
+            } catch (error) {
+                console.error('获取重载记录失败:', error);
+            }
+
+            const { listContainer, show } = createDialog(t("Reload History"));
+
+            if (!history.length) {
+                const empty = document.createElement("div");
+                empty.textContent = t("No reloads recorded yet.");
+                empty.style.padding = "10px";
+                empty.style.color = "#666";
+                empty.style.textAlign = "center";
+                listContainer.appendChild(empty);
+            }
+            history.forEach(record => {
+                const row = document.createElement("div");
+                row.style.display = "flex";
+                row.style.gap = "10px";
+                row.style.padding = "6px 8px";
+                row.style.borderBottom = "1px solid #333";
+                row.style.fontFamily = "monospace";
+                row.style.fontSize = "12px";
+                const time = document.createElement("span");
+                time.textContent = new Date(record.timestamp * 1000).toLocaleString();
+                time.style.color = "#888";
+                const status = document.createElement("span");
+                status.textContent = record.success ? t("Succeeded") : t("Failed");
+                status.style.color = record.success ? "#6c6" : "#e66";
+                const module = document.createElement("span");
+                module.textContent = record.module;
+                module.style.flex = "1";
+                module.style.color = "#eee";
+                module.title = record.file || "";
+                const duration = document.createElement("span");
+                duration.textContent = `${(record.duration * 1000).toFixed(0)} ms`;
+                duration.style.color = "#aaa";
+                row.appendChild(time);
+                row.appendChild(status);
+                row.appendChild(module);
+                row.appendChild(duration);
+                listContainer.appendChild(row);
+            });
+            show();
+        }
     }
 });
\ No newline at end of file